@@ -0,0 +1,17 @@
+"""SQL helpers shared by the harvesters."""
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+
+def upsert_id(session: Session, model, **keys) -> int:
+    """
+    Returns the id of the `model` row with the given unique key columns,
+    inserting it if needed, in a single upsert round-trip. The no-op update
+    lets RETURNING yield existing rows too.
+    """
+    table = model.__table__
+    column = next(iter(keys))
+    stmt = insert(table).values(**keys)
+    stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_={column: stmt.excluded[column]})
+    return session.execute(stmt.returning(table.c.id)).scalar_one()
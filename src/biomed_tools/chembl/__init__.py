@@ -2,4 +2,4 @@
 
 from . import config, harvester, models, utils
 from .api import ChemblAPI
-from .harvester import run_chembl_query, fetch_all_molecules
+from .harvester import run_chembl_query, fetch_all_molecules, iter_molecules
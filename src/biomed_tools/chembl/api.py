@@ -1,14 +1,42 @@
 from typing import Optional, Dict, Any, List, Union
+import random
 import time
+import orjson
 import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
 from loguru import logger
 from . import config
 
+_shared_session: Optional[requests.Session] = None
+
+def get_shared_session() -> requests.Session:
+    """
+    Returns a process-wide Session so every ChemblAPI instance reuses the same
+    keep-alive connection pool. The pool is sized for the harvester's workers.
+
+    Responses are cached on disk (SQLite) so repeated queries are served
+    locally; upstream Cache-Control/ETag headers are honoured.
+    """
+    global _shared_session
+    if _shared_session is None:
+        config.ensure_dir_exists()
+        _shared_session = requests_cache.CachedSession(
+            cache_name=str(config.CACHE_PATH),
+            backend="sqlite",
+            expire_after=config.CACHE_EXPIRE_AFTER,
+            allowable_methods=["GET"],
+            cache_control=True,
+        )
+        adapter = HTTPAdapter(pool_connections=config.MAX_WORKERS, pool_maxsize=config.MAX_WORKERS)
+        _shared_session.mount("https://", adapter)
+    return _shared_session
+
 class ChemblAPI:
     BASE_URL = config.API_BASE_URL
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or get_shared_session()
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
         url = f"{self.BASE_URL}/{endpoint}"
@@ -21,11 +49,13 @@ class ChemblAPI:
             try:
                 response = self.session.get(url, params=params)
                 response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
+                return orjson.loads(response.content)
+            except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
                 logger.warning(f"Request failed (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
                 if attempt < config.MAX_RETRIES - 1:
-                    time.sleep(config.RETRY_BACKOFF**attempt)
+                    # Runs on a pool worker, so only this request waits. Jitter keeps
+                    # workers that failed together from retrying in lockstep.
+                    time.sleep(config.RETRY_BACKOFF**attempt + random.uniform(0, 1))
                 else:
                     logger.error(f"Failed to fetch data from {url} after {config.MAX_RETRIES} attempts.")
                     return None
@@ -60,3 +90,27 @@ class ChemblAPI:
         endpoint: mechanism
         """
         return self._make_request("mechanism", {"molecule_chembl_id": chembl_id})
+
+    def molecule_mechanisms_bulk(self, chembl_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get mechanisms for many molecules, grouped by molecule ChEMBL ID.
+        endpoint: mechanism (filtered with molecule_chembl_id__in, MECHANISM_BATCH_SIZE IDs per request)
+        """
+        mechanisms: Dict[str, List[Dict[str, Any]]] = {chembl_id: [] for chembl_id in chembl_ids}
+        for start in range(0, len(chembl_ids), config.MECHANISM_BATCH_SIZE):
+            batch = chembl_ids[start:start + config.MECHANISM_BATCH_SIZE]
+            offset = 0
+            while True:
+                data = self._make_request("mechanism", {
+                    "molecule_chembl_id__in": ",".join(batch),
+                    "limit": config.MAX_PAGE_SIZE,
+                    "offset": offset,
+                })
+                if not data:
+                    break
+                for mech in data.get("mechanisms", []):
+                    mechanisms.setdefault(mech.get("molecule_chembl_id"), []).append(mech)
+                if not (data.get("page_meta") or {}).get("next"):
+                    break
+                offset += config.MAX_PAGE_SIZE
+        return mechanisms
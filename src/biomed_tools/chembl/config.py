@@ -1,18 +1,50 @@
 """Configuration constants for ChEMBL Miner."""
 
 import sys
+from datetime import timedelta
 from pathlib import Path
 from loguru import logger
 
 # --- Core Settings ---
 DB_URL = "sqlite:///db/chembl.db"
 LOG_FILE = Path("logs") / "chembl.log"
+CACHE_PATH = Path("cache") / "chembl_http"
 
 # --- ChEMBL API Settings ---
 API_BASE_URL = "https://www.ebi.ac.uk/chembl/api/data"
 CHUNK_SIZE = 20  # ChEMBL default page size is usually 20
+BATCH_SIZE = 500  # Molecules written and committed per transaction
+MECHANISM_BATCH_SIZE = 50  # Molecule IDs per molecule_chembl_id__in mechanism request
+MAX_PAGE_SIZE = 1000  # Largest `limit` the ChEMBL API accepts
 MAX_RETRIES = 3
 RETRY_BACKOFF = 2.0  # Base for exponential backoff
+MAX_WORKERS = 8  # Concurrent requests for pagination and mechanism lookups
+CACHE_EXPIRE_AFTER = timedelta(days=30)  # ChEMBL data only changes between releases
+
+# Top-level molecule fields the harvester stores. Requested via the API's `only`
+# parameter so pages don't carry unused payload such as molfiles and hierarchy data.
+MOLECULE_FIELDS = (
+    "molecule_chembl_id",
+    "pref_name",
+    "molecule_type",
+    "max_phase",
+    "therapeutic_flag",
+    "structure_type",
+    "molecule_structures",
+    "molecule_properties",
+    "molecule_synonyms",
+    "atc_classifications",
+    "cross_references",
+    "first_approval",
+    "black_box_warning",
+    "natural_product",
+    "prodrug",
+    "oral",
+    "parenteral",
+    "topical",
+    "inorganic_flag",
+    "dosed_ingredient",
+)
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
@@ -24,10 +56,11 @@ def get_db_path() -> Path:
     return Path(DB_URL.replace("sqlite:///", ""))
 
 def ensure_dir_exists():
-    """Ensures the data and logs directory for the database and logs exists."""
+    """Ensures the data, logs and cache directories exist."""
     db_path = get_db_path()
     db_path.parent.mkdir(parents=True, exist_ok=True)
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 _logging_configured = False
 
@@ -1,7 +1,11 @@
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 from loguru import logger
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
-from tqdm import tqdm
 from datetime import datetime
 
 from . import config
@@ -18,162 +22,266 @@ from .models import (
     SearchTerm,
     SearchToMolecule
 )
-from .utils import normalize_query
+from .utils import batched, normalize_query, progress_bar
 
 config.configure_logging()
 
-def fetch_all_molecules(query: str, max_records: int = 100) -> List[Dict]:
+CHILD_MODELS = (MoleculeProperty, MoleculeSynonym, Mechanism, MoleculeATC, MoleculeCrossReference)
+
+# (column, API key) pairs used to map API records to table rows
+MOLECULE_COLUMNS = (
+    ("pref_name", "pref_name"),
+    ("molecule_type", "molecule_type"),
+    ("max_phase", "max_phase"),
+    ("therapeutic_flag", "therapeutic_flag"),
+    ("structure_type", "structure_type"),
+    ("first_approval", "first_approval"),
+    ("black_box_warning", "black_box_warning"),
+    ("natural_product", "natural_product"),
+    ("prodrug", "prodrug"),
+    ("oral", "oral"),
+    ("parenteral", "parenteral"),
+    ("topical", "topical"),
+    ("inorganic_flag", "inorganic_flag"),
+    ("dosed_ingredient", "dosed_ingredient"),
+)
+STRUCTURE_COLUMNS = (
+    ("inchi_key", "standard_inchi_key"),
+    ("canonical_smiles", "canonical_smiles"),
+    ("standard_inchi", "standard_inchi"),
+)
+PROPERTY_COLUMNS = (
+    ("molecular_weight", "full_mwt"),
+    ("alogp", "alogp"),
+    ("hba", "hba"),
+    ("hbd", "hbd"),
+    ("psa", "psa"),
+    ("rtb", "rtb"),
+    ("aromatic_rings", "aromatic_rings"),
+    ("heavy_atoms", "heavy_atoms"),
+    ("mw_freebase", "mw_freebase"),
+    ("np_likeness_score", "np_likeness_score"),
+    ("num_ro5_violations", "num_ro5_violations"),
+    ("qed_weighted", "qed_weighted"),
+    ("ro3_pass", "ro3_pass"),
+)
+SYNONYM_COLUMNS = (
+    ("synonym", "molecule_synonym"),
+    ("syn_type", "syn_type"),
+)
+CROSS_REFERENCE_COLUMNS = (
+    ("xref_src", "xref_src"),
+    ("xref_id_val", "xref_id"),
+    ("xref_name", "xref_name"),
+)
+MECHANISM_COLUMNS = (
+    ("mechanism_of_action", "mechanism_of_action"),
+    ("target_name", "target_name"),
+    ("target_chembl_id", "target_chembl_id"),
+    ("action_type", "action_type"),
+)
+
+def iter_molecules(query: str, max_records: int = 100, api: Optional[ChemblAPI] = None) -> Iterator[Dict]:
     """
-    Fetch molecules matching query.
+    Yield molecules matching query page by page, as they arrive.
+
+    Page offsets are fixed by CHUNK_SIZE, so the second page is requested
+    alongside the first; once the first page reports the total count, up to
+    MAX_WORKERS further pages are kept in flight ahead of the consumer.
     """
-    api = ChemblAPI()
-    all_molecules = []
-    
-    # First request
-    params = {"limit": config.CHUNK_SIZE, "offset": 0}
-    data = api.search_molecules(query, params=params)
-    
-    if not data:
-        return []
-        
-    molecules = data.get("molecules", [])
-    if not molecules:
-        logger.info(f"No molecules found for query '{query}'")
-        return []
+    api = api or ChemblAPI()
 
-    all_molecules.extend(molecules)
-    
-    page_meta = data.get("page_meta", {})
-    total_count = page_meta.get("total_count", 0)
-    
-    logger.info(f"Found {total_count} molecules for query '{query}'")
-    
-    # Pagination
-    # Determine how many more to fetch
-    to_fetch = min(total_count, max_records)
-    
-    with tqdm(total=to_fetch, initial=len(molecules), desc="Fetching molecules") as pbar:
-        while len(all_molecules) < to_fetch:
-            next_offset = len(all_molecules)
-            params["offset"] = next_offset
-            
-            data = api.search_molecules(query, params=params)
-            if not data:
-                break
-                
-            new_molecules = data.get("molecules", [])
-            if not new_molecules:
-                break
-                
-            all_molecules.extend(new_molecules)
-            pbar.update(len(new_molecules))
+    def fetch_page(offset: int) -> Optional[Dict]:
+        params = {"limit": config.CHUNK_SIZE, "offset": offset, "only": ",".join(config.MOLECULE_FIELDS)}
+        return api.search_molecules(query, params=params)
+
+    with ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+        first_page = executor.submit(fetch_page, 0)
+        next_page = executor.submit(fetch_page, config.CHUNK_SIZE) if max_records > config.CHUNK_SIZE else None
+
+        data = first_page.result()
+        if not data:
+            return
             
-            # Safety break if no progress
-            if not new_molecules:
-                break
+        molecules = data.get("molecules", [])
+        if not molecules:
+            logger.info(f"No molecules found for query '{query}'")
+            return
+
+        page_meta = data.get("page_meta", {})
+        total_count = page_meta.get("total_count", 0)
+        
+        logger.info(f"Found {total_count} molecules for query '{query}'")
+        
+        # Pagination
+        # Determine how many more to fetch
+        to_fetch = min(total_count, max_records)
+        offsets = iter(range(2 * config.CHUNK_SIZE, to_fetch, config.CHUNK_SIZE))
+
+        # Pages are consumed in offset order, so a failed page stops the
+        # harvest at the same point the sequential loop would have.
+        pending = deque()
+        if next_page is not None and config.CHUNK_SIZE < to_fetch:
+            pending.append(next_page)
+        pending.extend(executor.submit(fetch_page, offset) for offset in islice(offsets, config.MAX_WORKERS))
+
+        # Pages can overlap at their boundaries, so drop molecules already yielded
+        seen = set()
+
+        def unseen(page_molecules: List[Dict]) -> List[Dict]:
+            fresh = []
+            for molecule in page_molecules:
+                chembl_id = molecule.get("molecule_chembl_id")
+                if chembl_id and chembl_id not in seen:
+                    seen.add(chembl_id)
+                    fresh.append(molecule)
+            return fresh
+
+        remaining = max_records
+        try:
+            with progress_bar(total=to_fetch, initial=len(molecules), desc="Fetching molecules") as pbar:
+                fresh = unseen(molecules)
+                yield from fresh[:remaining]
+                remaining -= len(fresh)
+
+                while pending and remaining > 0:
+                    page = pending.popleft().result()
+                    new_molecules = page.get("molecules", []) if page else []
+                    if not new_molecules:
+                        break
 
-    return all_molecules[:max_records]
+                    pending.extend(executor.submit(fetch_page, offset) for offset in islice(offsets, 1))
+                    pbar.update(len(new_molecules))
+                    fresh = unseen(new_molecules)
+                    if not fresh:
+                        # A page of nothing but repeats means pagination is stuck
+                        break
+                    yield from fresh[:remaining]
+                    remaining -= len(fresh)
+        finally:
+            for future in pending:
+                future.cancel()
 
-def process_and_store_molecule(session: Session, molecule_data: Dict):
+def fetch_all_molecules(query: str, max_records: int = 100, api: Optional[ChemblAPI] = None) -> List[Dict]:
     """
-    Store molecule data in DB.
+    Fetch molecules matching query.
+    """
+    return list(iter_molecules(query, max_records, api=api))
+
+def fetch_all_mechanisms(api: ChemblAPI, chembl_ids: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Fetch mechanisms for the given molecules, keyed by ChEMBL ID.
+
+    IDs are looked up MECHANISM_BATCH_SIZE at a time, with batches fetched concurrently.
+    """
+    chembl_ids = list(dict.fromkeys(chembl_ids))
+    mechanisms = {}
+    with ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+        for batch_mechanisms in executor.map(api.molecule_mechanisms_bulk, batched(chembl_ids, config.MECHANISM_BATCH_SIZE)):
+            mechanisms.update(batch_mechanisms)
+    return mechanisms
+
+def _map(source: Dict, columns: Tuple[Tuple[str, str], ...]) -> Dict:
+    return {column: source.get(key) for column, key in columns}
+
+def molecule_to_rows(molecule_data: Dict, mechanisms: Optional[List[Dict]] = None) -> Dict[type, List[Dict]]:
     """
+    Map a molecule record to plain row dicts, keyed by model.
+
+    `mechanisms` are the pre-fetched `/mechanism` records for the molecule.
+    """
+    rows = {model: [] for model in (Molecule,) + CHILD_MODELS}
     chembl_id = molecule_data.get("molecule_chembl_id")
     if not chembl_id:
-        return
+        return rows
 
-    # Create Molecule object
     props = molecule_data.get("molecule_properties") or {}
     struct = molecule_data.get("molecule_structures") or {}
     
-    molecule = Molecule(
-        chembl_id=chembl_id,
-        pref_name=molecule_data.get("pref_name"),
-        molecule_type=molecule_data.get("molecule_type"),
-        max_phase=molecule_data.get("max_phase"),
-        therapeutic_flag=molecule_data.get("therapeutic_flag"),
-        structure_type=molecule_data.get("structure_type"),
-        inchi_key=struct.get("standard_inchi_key"),
-        canonical_smiles=struct.get("canonical_smiles"),
-        standard_inchi=struct.get("standard_inchi"),
-        
-        first_approval=molecule_data.get("first_approval"),
-        black_box_warning=molecule_data.get("black_box_warning"),
-        natural_product=molecule_data.get("natural_product"),
-        prodrug=molecule_data.get("prodrug"),
-        oral=molecule_data.get("oral"),
-        parenteral=molecule_data.get("parenteral"),
-        topical=molecule_data.get("topical"),
-        inorganic_flag=molecule_data.get("inorganic_flag"),
-        dosed_ingredient=molecule_data.get("dosed_ingredient"),
-    )
+    rows[Molecule].append({
+        "chembl_id": chembl_id,
+        **_map(molecule_data, MOLECULE_COLUMNS),
+        **_map(struct, STRUCTURE_COLUMNS),
+    })
     
     # Properties
     if props:
-        # Check if values are None, SQLAlchemy handles None but just to be safe
-        molecule.properties = MoleculeProperty(
-            molecular_weight=props.get("full_mwt"),
-            alogp=props.get("alogp"),
-            hba=props.get("hba"),
-            hbd=props.get("hbd"),
-            psa=props.get("psa"),
-            rtb=props.get("rtb"),
-            
-            aromatic_rings=props.get("aromatic_rings"),
-            heavy_atoms=props.get("heavy_atoms"),
-            mw_freebase=props.get("mw_freebase"),
-            np_likeness_score=props.get("np_likeness_score"),
-            num_ro5_violations=props.get("num_ro5_violations"),
-            qed_weighted=props.get("qed_weighted"),
-            ro3_pass=props.get("ro3_pass"),
-        )
+        rows[MoleculeProperty].append({"chembl_id": chembl_id, **_map(props, PROPERTY_COLUMNS)})
         
     # Synonyms
-    synonyms_data = molecule_data.get("molecule_synonyms", [])
-    if synonyms_data:
-        molecule.synonyms = [
-            MoleculeSynonym(
-                synonym=syn.get("molecule_synonym"),
-                syn_type=syn.get("syn_type")
-            ) for syn in synonyms_data if syn.get("molecule_synonym")
-        ]
+    rows[MoleculeSynonym] = [
+        {"chembl_id": chembl_id, **_map(syn, SYNONYM_COLUMNS)}
+        for syn in molecule_data.get("molecule_synonyms") or [] if syn.get("molecule_synonym")
+    ]
         
     # ATC
-    atc_codes = molecule_data.get("atc_classifications", [])
-    if atc_codes:
-        molecule.atc_classifications = [
-            MoleculeATC(level5=code) for code in atc_codes
-        ]
+    rows[MoleculeATC] = [
+        {"chembl_id": chembl_id, "level5": code} for code in molecule_data.get("atc_classifications") or []
+    ]
         
     # Cross Refs
-    xrefs = molecule_data.get("cross_references", [])
-    if xrefs:
-        molecule.cross_references = [
-            MoleculeCrossReference(
-                xref_src=xref.get("xref_src"),
-                xref_id_val=xref.get("xref_id"),
-                xref_name=xref.get("xref_name")
-            ) for xref in xrefs
-        ]
+    rows[MoleculeCrossReference] = [
+        {"chembl_id": chembl_id, **_map(xref, CROSS_REFERENCE_COLUMNS)}
+        for xref in molecule_data.get("cross_references") or []
+    ]
 
     # Mechanisms
-    api = ChemblAPI()
-    mechanisms_data = api.molecule_mechanisms(chembl_id)
-    if mechanisms_data and "mechanisms" in mechanisms_data:
-        molecule.mechanisms = [
-            Mechanism(
-                mechanism_of_action=mech.get("mechanism_of_action"),
-                target_name=mech.get("target_name"),
-                target_chembl_id=mech.get("target_chembl_id"),
-                action_type=mech.get("action_type")
-            ) for mech in mechanisms_data["mechanisms"]
-        ]
+    rows[Mechanism] = [
+        {"chembl_id": chembl_id, **_map(mech, MECHANISM_COLUMNS)} for mech in mechanisms or []
+    ]
     
-    session.merge(molecule)
+    return rows
+
+def store_molecules(session: Session, molecules: List[Dict], mechanisms: Dict[str, List[Dict]], search_id: int):
+    """
+    Insert new molecules, update existing ones, replace their child rows and
+    link them to the search, issuing one statement per table rather than one
+    merge per molecule. Existing IDs are found with a single SELECT.
+    """
+    # Last record wins if the API returned a molecule twice
+    by_id = {m["molecule_chembl_id"]: m for m in molecules if m.get("molecule_chembl_id")}
+    if not by_id:
+        return
+
+    rows = {model: [] for model in (Molecule,) + CHILD_MODELS}
+    for chembl_id, mol_data in by_id.items():
+        for model, model_rows in molecule_to_rows(mol_data, mechanisms.get(chembl_id)).items():
+            rows[model].extend(model_rows)
+
+    chembl_ids = list(by_id)
+    molecule_table = Molecule.__table__
+    existing_ids = set(session.scalars(
+        select(molecule_table.c.chembl_id).where(molecule_table.c.chembl_id.in_(chembl_ids))
+    ))
+
+    # Only molecules already stored have child rows to replace; they are
+    # replaced wholesale, as the delete-orphan cascade did under merge
+    if existing_ids:
+        for model in CHILD_MODELS:
+            session.execute(delete(model.__table__).where(model.__table__.c.chembl_id.in_(existing_ids)))
+
+    new_rows = [row for row in rows[Molecule] if row["chembl_id"] not in existing_ids]
+    updated_rows = [row for row in rows[Molecule] if row["chembl_id"] in existing_ids]
+    if new_rows:
+        session.execute(insert(molecule_table), new_rows)
+    if updated_rows:
+        # ORM bulk UPDATE by primary key
+        session.execute(update(Molecule), updated_rows)
+
+    for model in CHILD_MODELS:
+        if rows[model]:
+            session.execute(insert(model.__table__), rows[model])
+
+    session.execute(
+        insert(SearchToMolecule.__table__).on_conflict_do_nothing(),
+        [{"search_id": search_id, "chembl_id": chembl_id} for chembl_id in chembl_ids],
+    )
 
 def run_chembl_query(query: str, max_records: int = 9999) -> int:
     create_tables()
     session = get_session()
+    api = ChemblAPI()
+    count = 0
     
     try:
         norm_query = normalize_query(query)
@@ -185,24 +293,25 @@ def run_chembl_query(query: str, max_records: int = 9999) -> int:
         else:
             search_term.timestamp = datetime.now()
         
-        molecules = fetch_all_molecules(query, max_records)
-        
-        for mol_data in tqdm(molecules, desc="Storing molecules"):
-            process_and_store_molecule(session, mol_data)
-            
-            # Link to search
-            chembl_id = mol_data.get("molecule_chembl_id")
-            if chembl_id:
-                link = SearchToMolecule(search_id=search_term.id, chembl_id=chembl_id)
-                session.merge(link)
+        search_id = search_term.id
+        # Molecules are stored and committed as pages stream in, so memory is
+        # bounded by BATCH_SIZE and a failure only loses the current batch.
+        for batch in batched(iter_molecules(query, max_records, api=api), config.BATCH_SIZE):
+            chembl_ids = [m["molecule_chembl_id"] for m in batch if m.get("molecule_chembl_id")]
+            mechanisms = fetch_all_mechanisms(api, chembl_ids)
+            store_molecules(session, batch, mechanisms, search_id)
+            session.commit()
+            session.expunge_all()
+            count += len(batch)
         
         session.commit()
-        logger.info(f"Successfully processed {len(molecules)} molecules.")
-        return len(molecules)
+        logger.info(f"Successfully processed {count} molecules.")
+        return count
         
     except Exception as e:
-        logger.exception(f"Error running ChEMBL query: {e}")
+        logger.exception(f"Error running ChEMBL query after storing {count} molecules: {e}")
         session.rollback()
-        return 0
+        # Earlier batches are already committed, so report them rather than 0
+        return count
     finally:
         session.close()
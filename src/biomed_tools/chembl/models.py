@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from sqlalchemy import (
     Column,
     Integer,
@@ -7,8 +9,11 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     DateTime,
+    Index,
     create_engine,
+    event,
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker, Session
 from . import config
 
@@ -48,7 +53,7 @@ class MoleculeProperty(Base):
     __tablename__ = "molecule_properties"
     
     id = Column(Integer, primary_key=True)
-    chembl_id = Column(String, ForeignKey("molecules.chembl_id"))
+    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), index=True)
     molecular_weight = Column(Float)
     alogp = Column(Float)
     hba = Column(Integer)
@@ -69,6 +74,7 @@ class MoleculeProperty(Base):
 
 class MoleculeSynonym(Base):
     __tablename__ = "molecule_synonyms"
+    __table_args__ = (Index("ix_molecule_synonyms_chembl_id_synonym", "chembl_id", "synonym"),)
     
     id = Column(Integer, primary_key=True)
     chembl_id = Column(String, ForeignKey("molecules.chembl_id"))
@@ -81,7 +87,7 @@ class Mechanism(Base):
     __tablename__ = "mechanisms"
     
     id = Column(Integer, primary_key=True)
-    chembl_id = Column(String, ForeignKey("molecules.chembl_id"))
+    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), index=True)
     mechanism_of_action = Column(String)
     target_name = Column(String)
     target_chembl_id = Column(String)
@@ -93,7 +99,7 @@ class MoleculeATC(Base):
     __tablename__ = "molecule_atc"
     
     id = Column(Integer, primary_key=True)
-    chembl_id = Column(String, ForeignKey("molecules.chembl_id"))
+    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), index=True)
     level5 = Column(String)
     
     molecule = relationship("Molecule", back_populates="atc_classifications")
@@ -102,7 +108,7 @@ class MoleculeCrossReference(Base):
     __tablename__ = "molecule_cross_refs"
     
     id = Column(Integer, primary_key=True)
-    chembl_id = Column(String, ForeignKey("molecules.chembl_id"))
+    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), index=True)
     xref_src = Column(String)
     xref_id_val = Column(String)
     xref_name = Column(String)
@@ -120,21 +126,48 @@ class SearchToMolecule(Base):
     __tablename__ = "search_to_molecule"
     
     search_id = Column(Integer, ForeignKey("search_terms.id"), primary_key=True)
-    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), primary_key=True)
+    chembl_id = Column(String, ForeignKey("molecules.chembl_id"), primary_key=True, index=True)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune SQLite for bulk loads: WAL journal, fewer fsyncs, in-memory temp storage."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")  # ~64 MB
+    cursor.close()
+
+@lru_cache(maxsize=None)
+def _engine_for(db_url: str) -> Engine:
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=None)
+def _session_factory(db_url: str) -> sessionmaker:
+    # The harvester writes through bulk statements and flushes explicitly, so
+    # autoflush and post-commit expiry are pure overhead.
+    return sessionmaker(bind=_engine_for(db_url), autoflush=False, expire_on_commit=False)
+
+def get_engine() -> Engine:
+    """Get the engine for the configured database, created once per DB_URL."""
+    return _engine_for(config.DB_URL)
 
 def create_tables():
     """Create all tables in the database."""
     config.ensure_dir_exists()
-    engine = create_engine(config.DB_URL)
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    # create_all skips existing tables, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def get_session() -> Session:
     """Get a new database session."""
-    engine = create_engine(config.DB_URL)
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+    return _session_factory(config.DB_URL)()
 
 def drop_tables():
     """Drop all tables in the database."""
-    engine = create_engine(config.DB_URL)
-    Base.metadata.drop_all(engine)
+    Base.metadata.drop_all(get_engine())
@@ -1,7 +1,34 @@
 """Utility functions for ChEMBL Miner."""
 
+import sys
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TypeVar
+
+from tqdm.auto import tqdm
+
+T = TypeVar("T")
+
+@lru_cache(maxsize=1024)
 def normalize_query(query: str) -> str:
     """
     Normalizes a search query by lowercasing and removing extra whitespace.
     """
     return " ".join(query.lower().split())
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Yields successive lists of up to `size` items from `iterable`.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def progress_bar(iterable: Optional[Iterable] = None, **kwargs) -> tqdm:
+    """
+    Returns a tqdm progress bar that redraws at most twice a second and is
+    disabled when stderr is not a terminal (CI, redirected logs).
+    """
+    kwargs.setdefault("mininterval", 0.5)
+    kwargs.setdefault("disable", not sys.stderr.isatty())
+    return tqdm(iterable, **kwargs)
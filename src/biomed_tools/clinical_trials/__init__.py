@@ -1,5 +1,30 @@
 """Clinical Trials Miner."""
 
-from . import config, harvester, models, utils
-from .api import ClinicalTrialsAPI
-from .harvester import run_clinical_trials_query, fetch_all_trials
+import importlib
+
+# Submodules and exports are imported on first access (PEP 562), so commands
+# that only touch the database don't pay for the HTTP stack and vice versa.
+_SUBMODULES = {"api", "config", "harvester", "models", "utils"}
+_EXPORTS = {
+    "AsyncClinicalTrialsAPI": "api",
+    "ClinicalTrialsAPI": "api",
+    "HttpxClinicalTrialsAPI": "api",
+    "fetch_all_trials": "harvester",
+    "run_clinical_trials_query": "harvester",
+}
+
+__all__ = sorted(_SUBMODULES | set(_EXPORTS))
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return __all__
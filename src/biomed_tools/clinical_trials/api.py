@@ -1,29 +1,246 @@
-from typing import Optional, Dict, Any, List, Union
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List, Mapping, Tuple, Union
+import random
+import sys
+import threading
 import time
+import orjson
 import requests
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from . import config
 
+# httpx, brotli and requests_cache are imported where they're used, so the
+# plain requests client doesn't load the HTTP/2 stack or the cache backend
+if TYPE_CHECKING:
+    import httpx
+    from requests_cache.serializers import SerializerPipeline
+
+_ENDPOINTS = MappingProxyType({
+    "list_studies": f"{config.API_BASE_URL}/studies",
+    "fetch_study": f"{config.API_BASE_URL}/studies/{{nctId}}",
+    "studies_metadata": f"{config.API_BASE_URL}/studies/metadata",
+    "search_areas": f"{config.API_BASE_URL}/studies/search-areas",
+    "enums": f"{config.API_BASE_URL}/studies/enums",
+    "size_stats": f"{config.API_BASE_URL}/stats/size",
+    "field_values_stats": f"{config.API_BASE_URL}/stats/field/values",
+    "list_field_sizes_stats": f"{config.API_BASE_URL}/stats/field/sizes",
+    "version": f"{config.API_BASE_URL}/version",
+})
+
+
+def _parameter(name: str, required: bool = False) -> Mapping[str, Union[str, bool]]:
+    return MappingProxyType({"name": name, "required": required})
+
+_PARAMETERS = MappingProxyType({
+    "list_studies": (
+        _parameter("format", required=False),
+        _parameter("markupFormat", required=False),
+        _parameter("query.cond", required=False),
+        _parameter("query.term", required=False),
+        _parameter("query.locn", required=False),
+        _parameter("query.titles", required=False),
+        _parameter("query.intr", required=False),
+        _parameter("query.outc", required=False),
+        _parameter("query.spons", required=False),
+        _parameter("query.lead", required=False),
+        _parameter("query.id", required=False),
+        _parameter("query.patient", required=False),
+        _parameter("filter.overallStatus", required=False),
+        _parameter("filter.geo", required=False),
+        _parameter("filter.ids", required=False),
+        _parameter("filter.advanced", required=False),
+        _parameter("filter.synonyms", required=False),
+        _parameter("postFilter.overallStatus", required=False),
+        _parameter("postFilter.geo", required=False),
+        _parameter("postFilter.ids", required=False),
+        _parameter("postFilter.advanced", required=False),
+        _parameter("postFilter.synonyms", required=False),
+        _parameter("aggFilters", required=False),
+        _parameter("geoDecay", required=False),
+        _parameter("fields", required=False),
+        _parameter("sort", required=False),
+        _parameter("countTotal", required=False),
+        _parameter("pageSize", required=False),
+        _parameter("pageToken", required=False),
+    ),
+    "fetch_study": (
+        _parameter("nctId", required=True),
+        _parameter("format", required=False),
+        _parameter("markupFormat", required=False),
+        _parameter("fields", required=False),
+    ),
+    "studies_metadata": (
+        _parameter("includeIndexedOnly", required=False),
+        _parameter("includeHistoricOnly", required=False),
+    ),
+    "field_values_stats": (
+        _parameter("types", required=False),
+        _parameter("fields", required=False),
+    ),
+    "list_field_sizes_stats": (
+        _parameter("fields", required=False),
+    ),
+    "version": (),
+})
+
+
+def _decompress(data: bytes) -> bytes:
+    import brotli
+
+    try:
+        return brotli.decompress(data)
+    except brotli.error as e:
+        # requests-cache treats ValueError as a cache miss, e.g. for entries
+        # written before compression was enabled
+        raise ValueError(f"Cached response is not brotli-compressed: {e}") from e
+
+
+def cache_serializer() -> "SerializerPipeline":
+    """
+    Returns the HTTP cache serializer: requests-cache's pickle pipeline followed by
+    brotli compression. Study JSON compresses several times over, so the cache
+    takes a fraction of the disk space and less I/O per read.
+    """
+    import brotli
+    from requests_cache.serializers import SerializerPipeline, Stage, pickle_serializer
+
+    compress = Stage(
+        dumps=lambda data: brotli.compress(data, quality=config.CACHE_COMPRESSION_QUALITY),
+        loads=_decompress,
+    )
+    return SerializerPipeline(
+        [*pickle_serializer.copy().stages, compress], name="pickle_brotli", is_binary=True
+    )
+
+
+def decode_json(response: Union[requests.Response, "httpx.Response"]) -> Any:
+    """
+    Decodes a JSON response body with orjson. Every client's _make_request goes
+    through here; don't call response.json(), which falls back to the much slower
+    stdlib parser. Raises orjson.JSONDecodeError on malformed bodies.
+    """
+    return orjson.loads(response.content)
+
+
+class LoggedRetry(Retry):
+    """
+    urllib3 Retry policy that jitters the exponential backoff, waits at least
+    as long as a server's Retry-After header asks, and logs every delay.
+    """
+
+    def get_backoff_time(self) -> float:
+        return super().get_backoff_time() * random.uniform(0.5, 1.5)
+
+    def sleep(self, response=None) -> None:
+        backoff = self.get_backoff_time()
+        retry_after = self.get_retry_after(response) if self.respect_retry_after_header and response else None
+        if retry_after is not None:
+            delay = max(retry_after, backoff)
+            logger.warning(f"HTTP {response.status}, retrying in {delay:.1f}s (Retry-After: {retry_after:.0f}s)")
+        else:
+            delay = backoff
+            logger.warning(f"Retrying request in {delay:.1f}s (attempt {len(self.history) + 1})")
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Returns how long the httpx clients wait before retrying a failed request, or
+    None to give up. As with the requests backend's LoggedRetry, only transport
+    errors and RETRY_STATUS_CODES are retried; a 404 or other client error fails
+    at once.
+    """
+    import httpx
+
+    retryable = isinstance(error, httpx.TransportError) or (
+        isinstance(error, httpx.HTTPStatusError) and error.response.status_code in config.RETRY_STATUS_CODES
+    )
+    if not retryable or attempt >= config.MAX_RETRIES - 1:
+        return None
+    return config.RETRY_BACKOFF**attempt * random.uniform(0.5, 1.5)
+
+
 class ClinicalTrialsAPI:
     BASE_URL = config.API_BASE_URL
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, warmup: bool = False):
+        self.session = self._create_session()
+        self.session.headers.update(config.HTTP_HEADERS)
+        # URL prefixes are built once rather than formatted on every request
+        self._base_prefix = self.BASE_URL.rstrip("/") + "/"
+        self._study_prefix = "studies/"
+        # Retries (including 429s with Retry-After) are handled by urllib3 in the adapter
+        retry = LoggedRetry(
+            total=config.MAX_RETRIES,
+            backoff_factor=config.RETRY_BACKOFF,
+            status_forcelist=config.RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_connections=config.POOL_CONNECTIONS, pool_maxsize=config.POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if warmup:
+            threading.Thread(target=self.warmup, daemon=True).start()
+
+    def __enter__(self) -> "ClinicalTrialsAPI":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the underlying HTTP session and its pooled connections."""
+        self.session.close()
+
+    def warmup(self) -> None:
+        """
+        Opens a pooled connection to the API (DNS, TCP and TLS handshakes) so the
+        first real request reuses it. Passing warmup=True to the constructor runs
+        this in a background thread. Failures are only logged.
+        """
+        try:
+            self._head(self._base_prefix)
+        except Exception as e:
+            logger.debug(f"Connection warmup failed: {e}")
+
+    def _head(self, url: str) -> None:
+        self.session.head(url, timeout=config.REQUEST_TIMEOUT)
+
+    @classmethod
+    def _create_session(cls) -> requests.Session:
+        """Returns a session backed by the local HTTP cache, unless caching is disabled."""
+        if not config.CACHE_ENABLED:
+            return requests.Session()
+
+        import requests_cache
+
+        config.ensure_dir_exists()
+        base_url = cls.BASE_URL.split("://", 1)[-1]
+        return requests_cache.CachedSession(
+            cache_name=str(config.CACHE_PATH),
+            backend="sqlite",
+            expire_after=config.CACHE_EXPIRE_AFTER,
+            urls_expire_after={f"{base_url}/{endpoint}": config.STATIC_CACHE_EXPIRE_AFTER for endpoint in config.STATIC_ENDPOINTS},
+            allowable_methods=["GET"],
+            cache_control=True,
+            serializer=cache_serializer(),
+        )
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        url = f"{self.BASE_URL}/{endpoint}"
-        for attempt in range(config.MAX_RETRIES):
-            try:
-                response = self.session.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Request failed (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
-                if attempt < config.MAX_RETRIES - 1:
-                    time.sleep(config.RETRY_BACKOFF**attempt)
-                else:
-                    logger.error(f"Failed to fetch data from {url} after {config.MAX_RETRIES} attempts.")
-                    return None
+        url = self._base_prefix + endpoint
+        try:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            return decode_json(response)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to fetch data from {url}: {e}")
+            return None
 
     def list_studies(self, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
@@ -81,38 +298,59 @@ class ClinicalTrialsAPI:
         :param max_pages: Maximum number of pages to fetch. Default is 10. If None, fetches all pages.
         :return: List of all studies across pages.
         """
+        return list(self.list_studies_paginated_iter(params, max_pages=max_pages))
+
+    def list_studies_paginated_iter(self, params: Optional[Dict[str, Any]] = None, max_pages: Optional[int] = 10) -> Iterator[Dict[str, Any]]:
+        """
+        Yields studies matching the query and filter parameters page by page, iterating through up to max_pages.
+        Only the current page and the one in flight are held in memory. Studies
+        already yielded (by NCT ID) are skipped.
+
+        :param params: Dictionary of query parameters. Pass `fields` to trim each study to what you need.
+        :param max_pages: Maximum number of pages to fetch. Default is 10. If None, fetches all pages.
+        :return: Generator of studies.
+        """
         if params is None:
             params = {}
         
         # Avoid modifying the original params dictionary
         current_params = params.copy()
         
-        all_studies = []
-        next_page_token = None
         page_count = 0
-
-        while max_pages is None or page_count < max_pages:
-            # Add the page token to the parameters if it exists
-            if next_page_token:
-                current_params["pageToken"] = next_page_token
-
-            # Pass a copy to avoid mutation side-effects if the caller inspects history
-            data = self._make_request("studies", current_params.copy())
-            if not data:
-                break
-            
-            # Collect studies from the current page
-            if "studies" in data:
-                all_studies.extend(data["studies"])
-            
-            # Check for the next page token
-            next_page_token = data.get("nextPageToken")
-            if not next_page_token:
-                break  # Exit the loop when there are no more pages
-            
-            page_count += 1  # Increment the page count
-
-        return all_studies
+        seen_ids = set()
+
+        # Page tokens are opaque, so pages can't be requested out of order. Instead
+        # the next page is requested as soon as its token is known, and the current
+        # page is consumed while that request is in flight.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # _make_request doesn't mutate params, and the page token is only
+            # updated once the in-flight request has completed, so no per-page copy
+            next_page = executor.submit(self._make_request, "studies", current_params)
+            while next_page is not None:
+                data = next_page.result()
+                next_page = None
+                if not data:
+                    break
+                page_count += 1  # Increment the page count
+
+                # Check for the next page token
+                next_page_token = data.get("nextPageToken")
+                if next_page_token and (max_pages is None or page_count < max_pages):
+                    current_params["pageToken"] = next_page_token
+                    next_page = executor.submit(self._make_request, "studies", current_params)
+
+                # Yield studies from the current page, skipping any already yielded
+                duplicates = 0
+                for study in data.get("studies", []):
+                    nct_id = study.get("protocolSection", {}).get("identificationModule", {}).get("nctId")
+                    if nct_id is not None:
+                        if nct_id in seen_ids:
+                            duplicates += 1
+                            continue
+                        seen_ids.add(nct_id)
+                    yield study
+                if duplicates:
+                    logger.debug(f"Skipped {duplicates} duplicate studies on page {page_count}")
 
 
     def fetch_study(self, nctId: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
@@ -132,7 +370,31 @@ class ClinicalTrialsAPI:
         study = api.fetch_study("NCT03540771")
         print(study)
         """
-        return self._make_request(f"studies/{nctId}", params)
+        return self._make_request(self._study_prefix + nctId, params)
+
+    def fetch_studies_batch(self, nct_ids: List[str], params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns data of many studies, fetching up to CHUNK_SIZE of them per request via `filter.ids`.
+
+        :param nct_ids: NCT Numbers of the studies.
+        :param params: Additional query parameters (e.g. fields) applied to every request.
+        :return: List of studies found. IDs the API doesn't know are silently missing.
+
+        Example usage:
+        api = ClinicalTrialsAPI()
+        studies = api.fetch_studies_batch(["NCT03540771", "NCT04280705"])
+        """
+        chunks = [nct_ids[i:i + config.CHUNK_SIZE] for i in range(0, len(nct_ids), config.CHUNK_SIZE)]
+
+        def fetch_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+            data = self.list_studies({**(params or {}), "filter.ids": ",".join(chunk), "pageSize": len(chunk)})
+            return data.get("studies", []) if data else []
+
+        studies = []
+        with ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+            for chunk_studies in executor.map(fetch_chunk, chunks):
+                studies.extend(chunk_studies)
+        return studies
 
     def studies_metadata(self, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
@@ -242,11 +504,12 @@ class ClinicalTrialsAPI:
         """
         return self._make_request("version")
 
-    def list_endpoints(self) -> Dict[str, str]:
+    def list_endpoints(self) -> Mapping[str, str]:
         """
         Lists all available endpoints for each method.
 
-        :return: Dictionary with method names as keys and endpoint URLs as values.
+        :return: Read-only mapping with method names as keys and endpoint URLs as values.
+            Use dict() on it for a mutable copy.
 
         Example usage:
         api = ClinicalTrialsAPI()
@@ -254,24 +517,13 @@ class ClinicalTrialsAPI:
         for method, endpoint in endpoints.items():
             print(f"{method}: {endpoint}")
         """
-        endpoints = {
-            "list_studies": f"{self.BASE_URL}/studies",
-            "fetch_study": f"{self.BASE_URL}/studies/{{nctId}}",
-            "studies_metadata": f"{self.BASE_URL}/studies/metadata",
-            "search_areas": f"{self.BASE_URL}/studies/search-areas",
-            "enums": f"{self.BASE_URL}/studies/enums",
-            "size_stats": f"{self.BASE_URL}/stats/size",
-            "field_values_stats": f"{self.BASE_URL}/stats/field/values",
-            "list_field_sizes_stats": f"{self.BASE_URL}/stats/field/sizes",
-            "version": f"{self.BASE_URL}/version",
-        }
-        return endpoints
+        return _ENDPOINTS
 
-    def list_parameters(self) -> Dict[str, List[Dict[str, Union[str, bool]]]]:
+    def list_parameters(self) -> Mapping[str, Tuple[Mapping[str, Union[str, bool]], ...]]:
         """
         Lists all available parameters for each method, indicating whether they are optional or required.
 
-        :return: Dictionary with method names as keys and list of parameters as values.
+        :return: Read-only mapping with method names as keys and tuples of parameters as values.
 
         Example usage:
         api = ClinicalTrialsAPI()
@@ -279,80 +531,185 @@ class ClinicalTrialsAPI:
         for method, params in parameters.items():
             print(f"{method}: {params}")
         """
-        parameters = {
-            "list_studies": [
-                {"name": "format", "required": False},
-                {"name": "markupFormat", "required": False},
-                {"name": "query.cond", "required": False},
-                {"name": "query.term", "required": False},
-                {"name": "query.locn", "required": False},
-                {"name": "query.titles", "required": False},
-                {"name": "query.intr", "required": False},
-                {"name": "query.outc", "required": False},
-                {"name": "query.spons", "required": False},
-                {"name": "query.lead", "required": False},
-                {"name": "query.id", "required": False},
-                {"name": "query.patient", "required": False},
-                {"name": "filter.overallStatus", "required": False},
-                {"name": "filter.geo", "required": False},
-                {"name": "filter.ids", "required": False},
-                {"name": "filter.advanced", "required": False},
-                {"name": "filter.synonyms", "required": False},
-                {"name": "postFilter.overallStatus", "required": False},
-                {"name": "postFilter.geo", "required": False},
-                {"name": "postFilter.ids", "required": False},
-                {"name": "postFilter.advanced", "required": False},
-                {"name": "postFilter.synonyms", "required": False},
-                {"name": "aggFilters", "required": False},
-                {"name": "geoDecay", "required": False},
-                {"name": "fields", "required": False},
-                {"name": "sort", "required": False},
-                {"name": "countTotal", "required": False},
-                {"name": "pageSize", "required": False},
-                {"name": "pageToken", "required": False}
-            ],
-            "fetch_study": [
-                {"name": "nctId", "required": True},
-                {"name": "format", "required": False},
-                {"name": "markupFormat", "required": False},
-                {"name": "fields", "required": False}
-            ],
-            "studies_metadata": [
-                {"name": "includeIndexedOnly", "required": False},
-                {"name": "includeHistoricOnly", "required": False}
-            ],
-            "field_values_stats": [
-                {"name": "types", "required": False},
-                {"name": "fields", "required": False}
-            ],
-            "list_field_sizes_stats": [
-                {"name": "fields", "required": False}
-            ],
-            "version": []
-        }
-        return parameters
+        return _PARAMETERS
     
     def print_dict_recursively(self, d, indent=0):
         """
-        Recursively print a dictionary with each key-value pair on a new line.
+        Print a dictionary as indented JSON with sorted keys.
         
         :param d: The dictionary to print.
-        :param indent: The current level of indentation (used for nested dictionaries).
-        """
-        for key, value in d.items():
-            print(' ' * indent + f"{key}: ", end='')
-            if isinstance(value, dict):
-                print()  # Move to a new line for nested dictionaries
-                self.print_dict_recursively(value, indent + 4)
-            elif isinstance(value, list):
-                print("[")
-                for item in value:
-                    if isinstance(item, dict):
-                        print(' ' * (indent + 4) + "{")
-                        self.print_dict_recursively(item, indent + 8)
-                        print(' ' * (indent + 4) + "},")
-                    else:
-                        print(' ' * (indent + 4) + f"{item},")
-                print(' ' * indent + "]")
-            else:
-                print(value)
+        :param indent: Unused; kept for backwards compatibility.
+        """
+        options = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        # One serialization and one write, rather than a print() per line
+        sys.stdout.write(orjson.dumps(d, default=str, option=options).decode())
+
+
+class HttpxClinicalTrialsAPI(ClinicalTrialsAPI):
+    """
+    ClinicalTrialsAPI backed by httpx over HTTP/2, so concurrent requests (page
+    prefetching, batched fetches) are multiplexed on a single connection instead
+    of one connection each. Responses are not cached.
+
+    Example usage:
+    with HttpxClinicalTrialsAPI() as api:
+        studies = api.list_studies_paginated({"query.cond": "asthma"})
+    """
+
+    def __init__(self, warmup: bool = False):
+        import httpx
+
+        self.client = httpx.Client(
+            http2=config.HTTP2_ENABLED,
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            timeout=config.REQUEST_TIMEOUT,
+            headers=config.HTTP_HEADERS,
+        )
+        self._base_prefix = self.BASE_URL.rstrip("/") + "/"
+        self._study_prefix = "studies/"
+        if warmup:
+            threading.Thread(target=self.warmup, daemon=True).start()
+
+    def __enter__(self) -> "HttpxClinicalTrialsAPI":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the underlying HTTP client."""
+        self.client.close()
+
+    def _head(self, url: str) -> None:
+        self.client.head(url)
+
+    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        import httpx
+
+        url = self._base_prefix + endpoint
+        for attempt in range(config.MAX_RETRIES):
+            try:
+                response = self.client.get(url, params=params)
+                response.raise_for_status()
+                return decode_json(response)
+            except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None:
+                    logger.error(f"Failed to fetch data from {url} (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
+                    return None
+                logger.warning(f"Request failed (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
+                time.sleep(delay)
+
+
+class AsyncClinicalTrialsAPI:
+    """
+    Asynchronous client for high-fanout workloads such as fetching many studies
+    by NCT ID. All requests share one httpx.AsyncClient connection pool (HTTP/2
+    when enabled), and at most `max_concurrency` are in flight at once.
+
+    Example usage:
+    async with AsyncClinicalTrialsAPI() as api:
+        studies = await api.fetch_studies_bulk(["NCT03540771", "NCT04280705"])
+    """
+    BASE_URL = config.API_BASE_URL
+
+    def __init__(self, max_concurrency: int = config.MAX_CONCURRENCY):
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+            keepalive_expiry=60,
+        )
+        self.client = httpx.AsyncClient(
+            http2=config.HTTP2_ENABLED, limits=limits, timeout=config.REQUEST_TIMEOUT, headers=config.HTTP_HEADERS
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._base_prefix = self.BASE_URL.rstrip("/") + "/"
+        self._study_prefix = "studies/"
+
+    async def __aenter__(self) -> "AsyncClinicalTrialsAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the underlying HTTP client."""
+        await self.client.aclose()
+
+    async def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        import httpx
+
+        url = self._base_prefix + endpoint
+        for attempt in range(config.MAX_RETRIES):
+            try:
+                async with self._semaphore:
+                    response = await self.client.get(url, params=params)
+                    response.raise_for_status()
+                    return decode_json(response)
+            except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None:
+                    logger.error(f"Failed to fetch data from {url} (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
+                    return None
+                logger.warning(f"Request failed (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
+                # Sleep outside the semaphore so other requests keep flowing
+                await asyncio.sleep(delay)
+
+    async def list_studies(self, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns data of studies matching query and filter parameters.
+        See ClinicalTrialsAPI.list_studies for the available parameters.
+        """
+        return await self._make_request("studies", params)
+
+    async def list_studies_paginated(self, params: Optional[Dict[str, Any]] = None, max_pages: Optional[int] = 10) -> List[Dict[str, Any]]:
+        """
+        Returns all studies matching the query and filter parameters, iterating through up to max_pages.
+        Pages are chained by nextPageToken, so they are fetched in order.
+        """
+        current_params = dict(params or {})
+        all_studies = []
+        page_count = 0
+
+        while max_pages is None or page_count < max_pages:
+            data = await self._make_request("studies", current_params)
+            if not data:
+                break
+            all_studies.extend(data.get("studies", []))
+            page_count += 1
+
+            next_page_token = data.get("nextPageToken")
+            if not next_page_token:
+                break
+            current_params["pageToken"] = next_page_token
+
+        return all_studies
+
+    async def fetch_study(self, nctId: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns data of a single study.
+        See ClinicalTrialsAPI.fetch_study for the available parameters.
+        """
+        return await self._make_request(self._study_prefix + nctId, params)
+
+    async def fetch_studies_bulk(self, nct_ids: List[str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetches many studies concurrently.
+
+        :param nct_ids: NCT Numbers of the studies.
+        :param params: Query parameters applied to every request.
+        :return: Dictionary mapping each NCT ID to its study, or None if it could not be fetched.
+        """
+        results = await asyncio.gather(
+            *(self.fetch_study(nct_id, params) for nct_id in nct_ids),
+            return_exceptions=True,
+        )
+        studies = {}
+        for nct_id, result in zip(nct_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch study {nct_id}: {result}")
+                result = None
+            studies[nct_id] = result
+        return studies
@@ -2,8 +2,6 @@
 
 import argparse
 
-from loguru import logger
-
 from .. import clinical_trials
 
 
@@ -20,6 +18,11 @@ def add_subparsers(subparsers):
         default=9999,
         help="Maximum number of records to download.",
     )
+    parser_harvest.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the local HTTP response cache.",
+    )
 
     # --- Clear command ---
     subparsers.add_parser("clear", help="Clear the database.")
@@ -30,9 +33,13 @@ def add_subparsers(subparsers):
 
 def main(args):
     """Main function for the Clinical Trials miner CLI."""
+    from loguru import logger
+
     clinical_trials.config.configure_logging()
 
     if args.subcommand == "harvest":
+        if args.no_cache:
+            clinical_trials.config.CACHE_ENABLED = False
         clinical_trials.harvester.run_clinical_trials_query(
             args.query, max_records=args.max_records
         )
@@ -1,34 +1,72 @@
 """Configuration constants for Clinical Trials Miner."""
 
+import os
 import sys
+from datetime import timedelta
+from functools import lru_cache
 from pathlib import Path
-from loguru import logger
 
 # --- Core Settings ---
 DB_URL = "sqlite:///db/clinical_trials.db"
 LOG_FILE = Path("logs") / "clinical_trials.log"
+CACHE_PATH = Path("cache") / "clinical_trials_http"
 
 # --- ClinicalTrials.gov API Settings ---
 API_BASE_URL = "https://clinicaltrials.gov/api/v2"
 API_URL = f"{API_BASE_URL}/studies"
 CHUNK_SIZE = 100  # Number of records to fetch per request
+BATCH_SIZE = 1000  # Trials stored and committed per transaction
+LOOKUP_BATCH_SIZE = 500  # Names per IN (...) query when resolving entity ids
 MAX_RETRIES = 3
 RETRY_BACKOFF = 2.0  # Base for exponential backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+MAX_WORKERS = 4  # Concurrent requests for batched study fetches
+MAX_CONCURRENCY = 20  # Concurrent requests for the async client
+REQUEST_TIMEOUT = 30.0  # Seconds
+HTTP2_ENABLED = True  # For the httpx-based clients; multiplexes concurrent requests on one connection
+# Client used by the harvester: "requests" (cached, pooled) or "httpx" (HTTP/2, uncached)
+HTTP_BACKEND = os.environ.get("CLINICAL_TRIALS_HTTP_BACKEND", "requests")
+# Worker processes for mapping studies to rows; 0 maps in-process. Pickling a
+# study to a worker and its rows back costs more than mapping it, so only
+# worth enabling if the mapping gets heavier.
+PARSE_WORKERS = int(os.environ.get("CLINICAL_TRIALS_PARSE_WORKERS", "0"))
+HTTP_HEADERS = {
+    "Accept-Encoding": "gzip, deflate, br",  # br needs the brotli package
+    "User-Agent": "biomed_tools (+https://github.com/bwilks-mediar/biomed_tools)",
+}
+
+# --- HTTP Cache Settings ---
+CACHE_ENABLED = True  # Disabled by `harvest --no-cache`
+CACHE_EXPIRE_AFTER = timedelta(hours=1)  # Unless the server's Cache-Control says otherwise
+STATIC_CACHE_EXPIRE_AFTER = timedelta(days=1)
+CACHE_COMPRESSION_QUALITY = 5  # Brotli quality, 0-11: 5 compresses well at a fraction of 11's CPU cost
+# Endpoints whose data only changes between API releases
+STATIC_ENDPOINTS = ("studies/metadata", "studies/search-areas", "studies/enums", "version")
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
 LOG_ROTATION = "10 MB"
 LOG_COMPRESSION = "zip"
 
+@lru_cache(maxsize=8)
+def _db_path(db_url: str) -> Path:
+    return Path(db_url.replace("sqlite:///", ""))
+
 def get_db_path() -> Path:
     """Returns the path to the database file."""
-    return Path(DB_URL.replace("sqlite:///", ""))
+    # Cached per URL, so reassigning DB_URL at runtime still takes effect
+    return _db_path(DB_URL)
+
+_created_dirs = set()
 
 def ensure_dir_exists():
     """Ensures the data and logs directory for the database and logs exists."""
-    db_path = get_db_path()
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    for directory in (get_db_path().parent, LOG_FILE.parent, CACHE_PATH.parent):
+        if directory not in _created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            _created_dirs.add(directory)
 
 _logging_configured = False
 
@@ -38,6 +76,8 @@ def configure_logging():
     if _logging_configured:
         return
 
+    from loguru import logger
+
     ensure_dir_exists()
     logger.add(
         LOG_FILE,
@@ -1,15 +1,24 @@
 """Core logic for fetching and processing ClinicalTrials.gov data."""
 
-import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, List
+from itertools import chain, islice
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
 
+import orjson
 from loguru import logger
+from sqlalchemy import Column, MetaData, String, Table, bindparam, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
+from .._sql import upsert_id
 from . import config
-from .api import ClinicalTrialsAPI
+from .api import ClinicalTrialsAPI, HttpxClinicalTrialsAPI
 from .models import (
     AdverseEvent,
     Arm,
@@ -31,278 +40,608 @@ from .models import (
     create_tables,
     get_session,
 )
-from .utils import normalize_query
+from .utils import batched, normalize_query
 
 # Configure logging when module is imported
 config.configure_logging()
 
+# Per-connection staging table for NCT IDs probed by find_existing_nct_ids
+_NCT_PROBE = Table(
+    "_nct_probe",
+    MetaData(),
+    Column("nct_id", String, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
 
-def fetch_all_trials(
-    query: str, page_size: int = 100, save_path: str = None
-) -> dict:
+# Child tables whose rows are mapped straight from a study
+CHILD_MODELS = (Outcome, Location, Reference, Eligibility, AdverseEvent)
+
+# Shared read-only fallback for missing or null sections, so lookups don't allocate
+_EMPTY = MappingProxyType({})
+
+
+def create_api(warmup: bool = False) -> ClinicalTrialsAPI:
+    """Returns a client for the configured HTTP backend."""
+    api_class = HttpxClinicalTrialsAPI if config.HTTP_BACKEND == "httpx" else ClinicalTrialsAPI
+    return api_class(warmup=warmup)
+
+
+def iter_trial_pages(
+    query: str,
+    page_size: int = 100,
+    api: Optional[ClinicalTrialsAPI] = None,
+    max_pages: Optional[int] = None,
+) -> Iterator[dict]:
     """
-    Fetch _all_ clinical trials matching `query` by following nextPageToken
-    until exhausted. Optionally save the combined raw JSON.
-    Returns a dict with:
-      - "totalCount": int
-      - "allStudies": list of study objects
+    Yield raw result pages for `query` as they arrive, following nextPageToken
+    until exhausted or `max_pages` pages have been fetched. The first page
+    carries "totalCount".
+
+    Page tokens are opaque, so pages can't be fetched out of order; instead the
+    next page is requested as soon as its token is known, and is in flight
+    while the caller processes (e.g. stores) the current one.
     """
-    all_studies = []
-    next_token = None
+    api = api or create_api()
+    params = {
+        "query.term": query,
+        "pageSize": page_size,
+        "format": "json",
+        "countTotal": "true",
+    }
     total_count = None
-    
-    api = ClinicalTrialsAPI()
-
-    with tqdm(desc="Fetching trial pages", unit="page") as pbar:
-        while True:
-            params = {
-                "query.term": query,
-                "pageSize": page_size,
-                "format": "json",
-                "countTotal": "true",
-            }
-            if next_token:
-                params["pageToken"] = next_token
-
-            data = api.list_studies(params=params)
-            
+    fetched = 0
+    page_count = 0
+
+    def fetch_page(token: Optional[str]) -> Optional[dict]:
+        return api.list_studies(params={**params, "pageToken": token} if token else params)
+
+    with ThreadPoolExecutor(max_workers=1) as executor, \
+         tqdm(desc="Fetching trial pages", unit="page") as pbar:
+        next_page = executor.submit(fetch_page, None)
+        while next_page is not None:
+            data = next_page.result()
+            next_page = None
             if not data:
                 break
+            page_count += 1
+
+            next_token = data.get("nextPageToken")
+            if next_token and (max_pages is None or page_count < max_pages):
+                next_page = executor.submit(fetch_page, next_token)
 
             if total_count is None:
                 total_count = data.get("totalCount", 0)
                 pbar.total = (total_count + page_size - 1) // page_size
 
             page_studies = data.get("studies", [])
-            all_studies.extend(page_studies)
+            fetched += len(page_studies)
 
             logger.info(
                 f"Fetched {len(page_studies)} studies "
-                f"(total so far: {len(all_studies)}/{total_count})"
+                f"(total so far: {fetched}/{total_count})"
             )
             pbar.update(1)
+            yield data
 
-            next_token = data.get("nextPageToken")
-            if not next_token:
-                break
 
-    result = {"totalCount": total_count, "studies": all_studies}
+def fetch_all_trials(
+    query: str, page_size: int = 100, save_path: str = None, api: Optional[ClinicalTrialsAPI] = None
+) -> dict:
+    """
+    Fetch _all_ clinical trials matching `query` by following nextPageToken
+    until exhausted. Optionally save the raw studies to `save_path` as NDJSON
+    (one study per line), written page by page as they arrive.
+    Returns a dict with:
+      - "totalCount": int
+      - "allStudies": list of study objects
+    """
+    all_studies = []
+    total_count = None
+
+    with open(save_path, "wb") if save_path else nullcontext() as f:
+        for data in iter_trial_pages(query, page_size, api=api):
+            if total_count is None:
+                total_count = data.get("totalCount", 0)
+            page_studies = data.get("studies", [])
+            all_studies.extend(page_studies)
+            if f is not None:
+                f.writelines(orjson.dumps(study, option=orjson.OPT_APPEND_NEWLINE) for study in page_studies)
 
     if save_path:
-        with open(save_path, "w") as f:
-            json.dump(result, f, indent=2)
         logger.info(f"🔖 All {len(all_studies)} studies saved to {save_path}")
 
-    return result
+    return {"totalCount": total_count, "studies": all_studies}
 
 
-def process_and_store_trial(session: Session, study: Dict, search_term_id: int):
+def export_trials(
+    query: str, save_path: str, page_size: int = 100, api: Optional[ClinicalTrialsAPI] = None
+) -> int:
     """
-    Processes a single clinical trial study and stores its normalized data
-    into the database.
+    Stream the studies matching `query` to `save_path` as NDJSON (one study
+    per line) and return how many were written. Unlike fetch_all_trials, no
+    studies are kept once their page is written, so memory stays at about the
+    current page plus the one in flight however large the result set is.
     """
-    proto = study.get("protocolSection", {})
-    ident_mod = proto.get("identificationModule", {})
-    status_mod = proto.get("statusModule", {})
-    design_mod = proto.get("designModule", {})
-    desc_mod = proto.get("descriptionModule", {})
-    eligibility_mod = proto.get("eligibilityModule", {})
-
-    nct_id = ident_mod.get("nctId")
-    if not nct_id:
-        logger.warning("Skipping study with no NCT ID.")
-        return
+    written = 0
+    with open(save_path, "wb") as f:
+        for data in iter_trial_pages(query, page_size, api=api):
+            page_studies = data.get("studies") or ()
+            f.writelines(orjson.dumps(study, option=orjson.OPT_APPEND_NEWLINE) for study in page_studies)
+            written += len(page_studies)
 
-    def _parse_date(date_struct):
-        if date_struct and "date" in date_struct:
-            try:
-                return datetime.strptime(date_struct["date"], "%Y-%m-%d")
-            except (ValueError, TypeError):
-                return None
+    logger.info(f"🔖 {written} studies saved to {save_path}")
+    return written
+
+
+@lru_cache(maxsize=8192)
+def _parse_date_string(date: str) -> Optional[datetime]:
+    # Trials share few distinct dates (e.g. update dates), so most calls are cache hits
+    try:
+        # Slicing the usual YYYY-MM-DD form is much cheaper than strptime
+        if isinstance(date, str) and len(date) == 10 and date[4] == "-" and date[7] == "-":
+            return datetime(int(date[:4]), int(date[5:7]), int(date[8:10]))
+        return datetime.strptime(date, "%Y-%m-%d")
+    except (ValueError, TypeError):
         return None
 
-    trial = ClinicalTrial(
-        nct_id=nct_id,
-        brief_title=ident_mod.get("briefTitle"),
-        official_title=ident_mod.get("officialTitle"),
-        acronym=ident_mod.get("acronym"),
-        overall_status=status_mod.get("overallStatus"),
-        start_date=_parse_date(status_mod.get("startDateStruct")),
-        primary_completion_date=_parse_date(
-            status_mod.get("primaryCompletionDateStruct")
-        ),
-        completion_date=_parse_date(status_mod.get("completionDateStruct")),
-        study_first_submit_date=_parse_date(
-            status_mod.get("studyFirstSubmitDateStruct")
-        ),
-        last_update_post_date=_parse_date(status_mod.get("lastUpdatePostDateStruct")),
-        enrollment_count=design_mod.get("enrollmentInfo", {}).get("count"),
-        study_type=design_mod.get("studyType"),
-        brief_summary=desc_mod.get("briefSummary"),
-        detailed_description=desc_mod.get("detailedDescription"),
-        has_results=study.get("hasResults", False),
+
+def _parse_date(date_struct):
+    if date_struct and "date" in date_struct:
+        try:
+            return _parse_date_string(date_struct["date"])
+        except TypeError:  # Unhashable value
+            return None
+    return None
+
+
+def _map(source: Mapping, schema: Tuple[tuple, ...], **keys) -> Dict:
+    """
+    Maps a nested dict to a row dict from a schema of (column, path[, converter])
+    entries; `keys` are the row's key columns, e.g. nct_id. Missing or null
+    sections along a path fall back to the shared _EMPTY mapping.
+    """
+    row = keys
+    for column, path, *converter in schema:
+        data = source
+        for key in path[:-1]:
+            data = data.get(key) or _EMPTY
+        value = data.get(path[-1])
+        row[column] = converter[0](value) if converter else value
+    return row
+
+
+# Column -> path (and optional converter) for each row mapped straight from a study
+TRIAL_SCHEMA = (
+    ("brief_title", ("protocolSection", "identificationModule", "briefTitle")),
+    ("official_title", ("protocolSection", "identificationModule", "officialTitle")),
+    ("acronym", ("protocolSection", "identificationModule", "acronym")),
+    ("overall_status", ("protocolSection", "statusModule", "overallStatus")),
+    ("start_date", ("protocolSection", "statusModule", "startDateStruct"), _parse_date),
+    ("primary_completion_date", ("protocolSection", "statusModule", "primaryCompletionDateStruct"), _parse_date),
+    ("completion_date", ("protocolSection", "statusModule", "completionDateStruct"), _parse_date),
+    ("study_first_submit_date", ("protocolSection", "statusModule", "studyFirstSubmitDateStruct"), _parse_date),
+    ("last_update_post_date", ("protocolSection", "statusModule", "lastUpdatePostDateStruct"), _parse_date),
+    ("enrollment_count", ("protocolSection", "designModule", "enrollmentInfo", "count")),
+    ("study_type", ("protocolSection", "designModule", "studyType")),
+    ("brief_summary", ("protocolSection", "descriptionModule", "briefSummary")),
+    ("detailed_description", ("protocolSection", "descriptionModule", "detailedDescription")),
+    ("has_results", ("hasResults",), bool),
+)
+OUTCOME_SCHEMA = (
+    ("type", ("type",)),
+    ("measure", ("measure",)),
+    ("description", ("description",)),
+    ("time_frame", ("timeFrame",)),
+)
+LOCATION_SCHEMA = (
+    ("facility", ("facility",)),
+    ("city", ("city",)),
+    ("state", ("state",)),
+    ("zip", ("zip",)),
+    ("country", ("country",)),
+    ("latitude", ("geoPoint", "lat")),
+    ("longitude", ("geoPoint", "lon")),
+)
+REFERENCE_SCHEMA = (
+    ("pmid", ("pmid",)),
+    ("type", ("type",)),
+    ("citation", ("citation",)),
+)
+ARM_SCHEMA = (
+    ("label", ("label",)),
+    ("type", ("type",)),
+    ("description", ("description",)),
+)
+ELIGIBILITY_SCHEMA = (
+    ("criteria", ("eligibilityCriteria",)),
+    ("healthy_volunteers", ("healthyVolunteers",)),
+    ("sex", ("sex",)),
+    ("minimum_age", ("minimumAge",)),
+    ("maximum_age", ("maximumAge",)),
+)
+
+
+def _trial_upsert():
+    upsert = insert(ClinicalTrial.__table__)
+    return upsert.on_conflict_do_update(
+        index_elements=["nct_id"],
+        set_={
+            **{column: upsert.excluded[column] for column, *_ in TRIAL_SCHEMA},
+            "timestamp": func.now(),
+        },
     )
-    session.merge(trial)
-
-    # Organizations
-    orgs = [ident_mod.get("organization")] + proto.get(
-        "sponsorCollaboratorsModule", {}
-    ).get("collaborators", [])
-    for org_data in orgs:
-        if org_data and "fullName" in org_data:
-            org = session.query(Organization).filter_by(name=org_data["fullName"]).first()
-            if not org:
-                org = Organization(
-                    name=org_data["fullName"], class_=org_data.get("class")
-                )
-                session.add(org)
-                session.flush()  # Get ID for the new org
-            session.merge(
-                TrialOrganization(
-                    trial_nct_id=nct_id,
-                    organization_id=org.id,
-                    role="SPONSOR"
-                    if org_data == ident_mod.get("organization")
-                    else "COLLABORATOR",
-                )
-            )
 
-    # Conditions
-    for cond_name in proto.get("conditionsModule", {}).get("conditions", []):
-        condition = session.query(Condition).filter_by(name=cond_name).first()
-        if not condition:
-            condition = Condition(name=cond_name)
-            session.add(condition)
-            session.flush()
-        session.merge(
-            TrialCondition(trial_nct_id=nct_id, condition_id=condition.id)
-        )
 
-    # Keywords
-    for kw_name in proto.get("conditionsModule", {}).get("keywords", []):
-        keyword = session.query(Keyword).filter_by(name=kw_name).first()
-        if not keyword:
-            keyword = Keyword(name=kw_name)
-            session.add(keyword)
-            session.flush()
-        session.merge(TrialKeyword(trial_nct_id=nct_id, keyword_id=keyword.id))
-
-    # Arms and Interventions
-    arms_interventions = proto.get("armsInterventionsModule", {})
-    for arm_data in arms_interventions.get("armGroups", []):
-        arm = Arm(
-            trial_nct_id=nct_id,
-            label=arm_data.get("label"),
-            type=arm_data.get("type"),
-            description=arm_data.get("description"),
-        )
-        session.add(arm)
-        session.flush()
-        for int_name in arm_data.get("interventionNames", []):
-            # Find the full intervention details
-            int_details = next(
-                (
-                    i
-                    for i in arms_interventions.get("interventions", [])
-                    if i["name"] == int_name.split(": ")[-1]
-                ),
-                None,
-            )
-            if int_details:
-                intervention = (
-                    session.query(Intervention)
-                    .filter_by(name=int_details["name"], type=int_details["type"])
-                    .first()
-                )
-                if not intervention:
-                    intervention = Intervention(
-                        name=int_details["name"],
-                        type=int_details["type"],
-                        description=int_details.get("description"),
-                    )
-                    session.add(intervention)
-                    session.flush()
-                session.merge(
-                    ArmIntervention(arm_id=arm.id, intervention_id=intervention.id)
-                )
-
-    # Outcomes
-    for outcome_data in proto.get("outcomesModule", {}).get("primaryOutcomes", []) + proto.get(
-        "outcomesModule", {}
-    ).get("secondaryOutcomes", []):
-        outcome = Outcome(
-            trial_nct_id=nct_id,
-            type=outcome_data.get("type"),
-            measure=outcome_data.get("measure"),
-            description=outcome_data.get("description"),
-            time_frame=outcome_data.get("timeFrame"),
-        )
-        session.add(outcome)
-
-    # Locations
-    for loc_data in proto.get("contactsLocationsModule", {}).get("locations", []):
-        location = Location(
-            trial_nct_id=nct_id,
-            facility=loc_data.get("facility"),
-            city=loc_data.get("city"),
-            state=loc_data.get("state"),
-            zip=loc_data.get("zip"),
-            country=loc_data.get("country"),
-            latitude=loc_data.get("geoPoint", {}).get("lat"),
-            longitude=loc_data.get("geoPoint", {}).get("lon"),
-        )
-        session.add(location)
-
-    # References
-    for ref_data in proto.get("referencesModule", {}).get("references", []):
-        reference = Reference(
-            trial_nct_id=nct_id,
-            pmid=ref_data.get("pmid"),
-            type=ref_data.get("type"),
-            citation=ref_data.get("citation"),
-        )
-        session.add(reference)
+# Write statements are built once rather than per batch; SQLAlchemy's compiled
+# cache then serves every execution without rebuilding or re-keying the construct
+_TRIAL_UPSERT = _trial_upsert()
+_CHILD_INSERTS = {model: insert(model.__table__) for model in CHILD_MODELS}
+_SEARCH_LINK_INSERT = insert(SearchToTrial.__table__).on_conflict_do_nothing()
+
+
+def study_to_rows(study: Dict) -> Dict[type, List[Dict]]:
+    """
+    Maps a study to plain row dicts, keyed by model, for the trial itself and
+    the child tables that don't reference shared entities.
+    """
+    rows = {model: [] for model in (ClinicalTrial,) + CHILD_MODELS}
+    proto = study.get("protocolSection") or _EMPTY
 
-    # Eligibility
+    nct_id = (proto.get("identificationModule") or _EMPTY).get("nctId")
+    if not nct_id:
+        return rows
+
+    rows[ClinicalTrial].append(_map(study, TRIAL_SCHEMA, nct_id=nct_id))
+
+    outcomes_mod = proto.get("outcomesModule") or _EMPTY
+    rows[Outcome] = [
+        _map(outcome_data, OUTCOME_SCHEMA, trial_nct_id=nct_id)
+        for outcome_data in chain(outcomes_mod.get("primaryOutcomes") or (), outcomes_mod.get("secondaryOutcomes") or ())
+    ]
+    rows[Location] = [
+        _map(loc_data, LOCATION_SCHEMA, trial_nct_id=nct_id)
+        for loc_data in (proto.get("contactsLocationsModule") or _EMPTY).get("locations") or ()
+    ]
+    rows[Reference] = [
+        _map(ref_data, REFERENCE_SCHEMA, trial_nct_id=nct_id)
+        for ref_data in (proto.get("referencesModule") or _EMPTY).get("references") or ()
+    ]
+    eligibility_mod = proto.get("eligibilityModule")
     if eligibility_mod:
-        eligibility = Eligibility(
-            trial_nct_id=nct_id,
-            criteria=eligibility_mod.get("eligibilityCriteria"),
-            healthy_volunteers=eligibility_mod.get("healthyVolunteers"),
-            sex=eligibility_mod.get("sex"),
-            minimum_age=eligibility_mod.get("minimumAge"),
-            maximum_age=eligibility_mod.get("maximumAge"),
-        )
-        session.add(eligibility)
+        rows[Eligibility].append(_map(eligibility_mod, ELIGIBILITY_SCHEMA, trial_nct_id=nct_id))
 
     # Adverse Events
-    results_section = study.get("resultsSection", {})
+    results_section = study.get("resultsSection")
     if results_section:
-        adverse_mod = results_section.get("adverseEventsModule", {})
+        adverse_mod = results_section.get("adverseEventsModule") or _EMPTY
         event_groups = {
-            eg["id"]: eg["title"] for eg in adverse_mod.get("eventGroups", [])
+            eg["id"]: eg["title"] for eg in adverse_mod.get("eventGroups") or ()
         }
-        for event_list, is_serious in [
-            (adverse_mod.get("seriousEvents", []), True),
-            (adverse_mod.get("otherEvents", []), False),
-        ]:
+        for event_list, is_serious in (
+            (adverse_mod.get("seriousEvents") or (), True),
+            (adverse_mod.get("otherEvents") or (), False),
+        ):
             for event in event_list:
-                for stat in event.get("stats", []):
-                    adverse_event = AdverseEvent(
-                        trial_nct_id=nct_id,
-                        term=event.get("term"),
-                        organ_system=event.get("organSystem"),
-                        source_vocabulary=event.get("sourceVocabulary"),
-                        assessment_type=event.get("assessmentType"),
-                        is_serious=is_serious,
-                        num_affected=stat.get("numAffected"),
-                        num_at_risk=stat.get("numAtRisk"),
-                        group_id=stat.get("groupId"),
-                        group_title=event_groups.get(stat.get("groupId")),
-                    )
-                    session.add(adverse_event)
-
-    session.merge(SearchToTrial(search_id=search_term_id, nct_id=nct_id))
+                for stat in event.get("stats") or ():
+                    rows[AdverseEvent].append({
+                        "trial_nct_id": nct_id,
+                        "term": event.get("term"),
+                        "organ_system": event.get("organSystem"),
+                        "source_vocabulary": event.get("sourceVocabulary"),
+                        "assessment_type": event.get("assessmentType"),
+                        "is_serious": is_serious,
+                        "num_affected": stat.get("numAffected"),
+                        "num_at_risk": stat.get("numAtRisk"),
+                        "group_id": stat.get("groupId"),
+                        "group_title": event_groups.get(stat.get("groupId")),
+                    })
+
+    return rows
+
+
+@lru_cache(maxsize=None)
+def _entity_statements(model, key_columns: Tuple[str, ...]):
+    """Returns the (lookup, insert) statements for an entity table, built once per key."""
+    table = model.__table__
+    columns = [table.c[column] for column in key_columns]
+    key_expr = columns[0] if len(columns) == 1 else tuple_(*columns)
+    lookup = select(table.c.id, *columns).where(key_expr.in_(bindparam("keys", expanding=True)))
+    return lookup, insert(table).returning(table.c.id, *columns)
+
+
+def _entity_ids(session: Session, model, key_columns: Tuple[str, ...], rows_by_key: Dict[tuple, Dict]) -> Dict[tuple, int]:
+    """
+    Returns the ids of entity rows keyed by their natural key, selecting
+    existing rows and inserting the missing ones in bulk.
+    """
+    lookup, create = _entity_statements(model, key_columns)
+
+    ids = {}
+    for keys in batched(rows_by_key, config.LOOKUP_BATCH_SIZE):
+        values = [key[0] for key in keys] if len(key_columns) == 1 else keys
+        for row in session.execute(lookup, {"keys": values}):
+            ids[tuple(row[1:])] = row[0]
+
+    missing = [row for key, row in rows_by_key.items() if key not in ids]
+    if missing:
+        inserted = session.execute(create, missing)
+        for row in inserted:
+            ids[tuple(row[1:])] = row[0]
+    return ids
+
+
+def _intervention_key(int_details: Dict) -> Tuple[str, str]:
+    # A missing type is stored as "" because SQLite treats NULLs as distinct in
+    # unique indexes, and `type IN (...)` never matches NULL on lookup
+    return int_details["name"], int_details.get("type") or ""
+
+
+def store_trial_entities(session: Session, studies: List[Tuple[Dict, str]]):
+    """
+    Stores the organizations, conditions, keywords, arms and interventions of
+    (study, nct_id) pairs, reusing entities already in the database. Distinct
+    entities across the batch are resolved with one SELECT and one INSERT per
+    table rather than a lookup per trial.
+    """
+    orgs, conditions, keywords, interventions = {}, {}, {}, {}
+    for study, _ in studies:
+        proto = study.get("protocolSection") or _EMPTY
+        ident_mod = proto.get("identificationModule") or _EMPTY
+        collaborators = (proto.get("sponsorCollaboratorsModule") or _EMPTY).get("collaborators") or ()
+        for org_data in (ident_mod.get("organization"), *collaborators):
+            if org_data and "fullName" in org_data:
+                orgs.setdefault((org_data["fullName"],), {"name": org_data["fullName"], "class": org_data.get("class")})
+        conditions_mod = proto.get("conditionsModule") or _EMPTY
+        for cond_name in conditions_mod.get("conditions") or ():
+            conditions.setdefault((cond_name,), {"name": cond_name})
+        for kw_name in conditions_mod.get("keywords") or ():
+            keywords.setdefault((kw_name,), {"name": kw_name})
+        for int_details in (proto.get("armsInterventionsModule") or _EMPTY).get("interventions") or ():
+            key = _intervention_key(int_details)
+            interventions.setdefault(
+                key, {"name": key[0], "type": key[1], "description": int_details.get("description")}
+            )
+
+    org_ids = _entity_ids(session, Organization, ("name",), orgs)
+    condition_ids = _entity_ids(session, Condition, ("name",), conditions)
+    keyword_ids = _entity_ids(session, Keyword, ("name",), keywords)
+    intervention_ids = _entity_ids(session, Intervention, ("name", "type"), interventions)
+
+    # Keyed/deduplicated so a name listed twice on a trial yields one link
+    trial_orgs, trial_conditions, trial_keywords = {}, set(), set()
+    arm_rows, arm_intervention_id_lists = [], []
+    for study, nct_id in studies:
+        proto = study.get("protocolSection") or _EMPTY
+        ident_mod = proto.get("identificationModule") or _EMPTY
+
+        # Organizations
+        collaborators = (proto.get("sponsorCollaboratorsModule") or _EMPTY).get("collaborators") or ()
+        study_orgs = (ident_mod.get("organization"), *collaborators)
+        for org_data in study_orgs:
+            if org_data and "fullName" in org_data:
+                org_id = org_ids[(org_data["fullName"],)]
+                # Last role wins, as with the merge this replaces
+                trial_orgs[(nct_id, org_id)] = {
+                    "trial_nct_id": nct_id,
+                    "organization_id": org_id,
+                    "role": "SPONSOR"
+                    if org_data == ident_mod.get("organization")
+                    else "COLLABORATOR",
+                }
+
+        # Conditions and Keywords
+        conditions_mod = proto.get("conditionsModule") or _EMPTY
+        trial_conditions.update(
+            (nct_id, condition_ids[(cond_name,)]) for cond_name in conditions_mod.get("conditions") or ()
+        )
+        trial_keywords.update(
+            (nct_id, keyword_ids[(kw_name,)]) for kw_name in conditions_mod.get("keywords") or ()
+        )
+
+        # Arms and Interventions
+        arms_interventions = proto.get("armsInterventionsModule") or _EMPTY
+        # Reversed so the first intervention with a given name wins, as with a linear scan
+        interventions_by_name = {i["name"]: i for i in reversed(arms_interventions.get("interventions") or ())}
+        for arm_data in arms_interventions.get("armGroups") or ():
+            arm_rows.append(_map(arm_data, ARM_SCHEMA, trial_nct_id=nct_id))
+            arm_intervention_ids = []
+            for int_name in arm_data.get("interventionNames") or ():
+                # Find the full intervention details
+                int_details = interventions_by_name.get(int_name.split(": ")[-1])
+                if int_details:
+                    arm_intervention_ids.append(intervention_ids[_intervention_key(int_details)])
+            arm_intervention_id_lists.append(arm_intervention_ids)
+
+    if trial_orgs:
+        stmt = insert(TrialOrganization.__table__)
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["trial_nct_id", "organization_id"], set_={"role": stmt.excluded.role}
+            ),
+            list(trial_orgs.values()),
+        )
+    for model, entity_column, links in (
+        (TrialCondition, "condition_id", trial_conditions),
+        (TrialKeyword, "keyword_id", trial_keywords),
+    ):
+        if links:
+            session.execute(
+                insert(model.__table__).on_conflict_do_nothing(),
+                [{"trial_nct_id": nct_id, entity_column: entity_id} for nct_id, entity_id in links],
+            )
+
+    if arm_rows:
+        arm_table = Arm.__table__
+        arm_ids = session.scalars(
+            insert(arm_table).returning(arm_table.c.id, sort_by_parameter_order=True), arm_rows
+        ).all()
+        arm_interventions = [
+            {"arm_id": arm_id, "intervention_id": intervention_id}
+            for arm_id, intervention_ids_for_arm in zip(arm_ids, arm_intervention_id_lists)
+            for intervention_id in intervention_ids_for_arm
+        ]
+        if arm_interventions:
+            session.execute(insert(ArmIntervention.__table__).on_conflict_do_nothing(), arm_interventions)
+
+
+def dedupe_studies(studies: List[Dict]) -> List[Dict]:
+    """
+    Drops repeated studies by NCT ID, keeping the last copy (the API can return
+    a study on two pages if it is updated mid-harvest). Studies without an NCT
+    ID are kept so callers can report them.
+    """
+    by_id = {}
+    for index, study in enumerate(studies):
+        nct_id = ((study.get("protocolSection") or _EMPTY).get("identificationModule") or _EMPTY).get("nctId")
+        by_id[nct_id if nct_id else index] = study
+    return list(by_id.values())
+
+
+@lru_cache(maxsize=None)
+def _raw_insert_sql(table: Table, columns: Tuple[str, ...], dialect) -> str:
+    preparer = dialect.identifier_preparer
+    return (
+        f"INSERT INTO {preparer.format_table(table)} ({', '.join(map(preparer.quote, columns))}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
+
+def insert_rows(session: Session, model, rows: List[Dict]):
+    """
+    Inserts plain rows (all with the same keys) into a child table. On SQLite
+    the rows go straight to the DB-API cursor's executemany as tuples, inside
+    the session's transaction, skipping SQLAlchemy's per-row parameter
+    processing; other dialects use the Core insert.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        session.execute(_CHILD_INSERTS[model], rows)
+        return
+    columns = tuple(rows[0])
+    sql = _raw_insert_sql(model.__table__, columns, connection.dialect)
+    values = itemgetter(*columns)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.executemany(sql, [values(row) for row in rows])
+    finally:
+        cursor.close()
+
+
+def link_trials_to_search(session: Session, search_term_id: int, nct_ids: Iterable[str]):
+    """
+    Links trials to a search with one INSERT OR IGNORE, so links that already
+    exist cost nothing and no row is read back first.
+    """
+    links = [{"search_id": search_term_id, "nct_id": nct_id} for nct_id in nct_ids]
+    if links:
+        session.execute(_SEARCH_LINK_INSERT, links)
+
+
+def store_studies(
+    session: Session, studies: List[Dict], search_term_id: int, executor: Optional[Executor] = None
+):
+    """
+    Stores studies and links them to the search. Trials are upserted and their
+    child rows inserted with one executemany statement per table, instead of a
+    merge and an add per row. If `executor` is given, studies are mapped to
+    rows on it; database writes always stay on the calling thread.
+
+    Studies must be unique by NCT ID (see dedupe_studies); store_trials
+    deduplicates its batch before calling this.
+    """
+    rows = {model: [] for model in (ClinicalTrial,) + CHILD_MODELS}
+    stored = []
+    parsed = executor.map(study_to_rows, studies, chunksize=50) if executor else map(study_to_rows, studies)
+    for study, study_rows in zip(studies, parsed):
+        if not study_rows[ClinicalTrial]:
+            logger.warning("Skipping study with no NCT ID.")
+            continue
+        for model, model_rows in study_rows.items():
+            rows[model].extend(model_rows)
+        stored.append((study, study_rows[ClinicalTrial][0]["nct_id"]))
+
+    if not stored:
+        return
+
+    session.execute(_TRIAL_UPSERT, rows[ClinicalTrial])
+
+    for model in CHILD_MODELS:
+        if rows[model]:
+            insert_rows(session, model, rows[model])
+
+    store_trial_entities(session, stored)
+
+    link_trials_to_search(session, search_term_id, [nct_id for _, nct_id in stored])
+
+
+def process_and_store_trial(session: Session, study: Dict, search_term_id: int):
+    """
+    Processes a single clinical trial study and stores its normalized data
+    into the database.
+    """
+    store_studies(session, [study], search_term_id)
+
+
+def find_existing_nct_ids(session: Session, nct_ids: List[str]) -> Set[str]:
+    """
+    Returns the NCT IDs already stored. The IDs are staged in a temporary table
+    and joined against, so the statement stays the same size however many IDs
+    there are and never approaches SQLite's bound-parameter limit.
+    """
+    if not nct_ids:
+        return set()
+    connection = session.connection()
+    _NCT_PROBE.create(connection, checkfirst=True)
+    connection.execute(_NCT_PROBE.delete())
+    connection.execute(
+        _NCT_PROBE.insert().prefix_with("OR IGNORE"), [{"nct_id": nct_id} for nct_id in nct_ids]
+    )
+    trial_table = ClinicalTrial.__table__
+    return set(connection.scalars(
+        select(trial_table.c.nct_id).join(_NCT_PROBE, _NCT_PROBE.c.nct_id == trial_table.c.nct_id)
+    ))
+
+
+def store_trials(
+    session: Session, studies: List[Dict], search_term_id: int, executor: Optional[Executor] = None
+) -> int:
+    """
+    Stores a batch of studies, linking trials already in the database to the
+    search and processing the rest (mapping them on `executor`, if given).
+    Returns the number of new trials.
+    """
+    studies = dedupe_studies(studies)
+    nct_ids = [
+        study["protocolSection"]["identificationModule"]["nctId"]
+        for study in studies
+        if "protocolSection" in study
+        and "identificationModule" in study["protocolSection"]
+    ]
+    existing_nct_ids = find_existing_nct_ids(session, nct_ids)
+    logger.info(
+        f"Found {len(existing_nct_ids)} trials already in the database."
+    )
+
+    link_trials_to_search(session, search_term_id, existing_nct_ids)
+
+    new_studies = [
+        study
+        for study in studies
+        if "protocolSection" in study
+        and "identificationModule" in study["protocolSection"]
+        and study["protocolSection"]["identificationModule"]["nctId"]
+        not in existing_nct_ids
+    ]
+    logger.info(f"🔍 Processing and storing {len(new_studies)} new trials...")
+
+    store_studies(session, new_studies, search_term_id, executor)
+
+    return len(new_studies)
+
+
+def get_or_create_search_term(session: Session, term: str) -> int:
+    """Returns the id of the search term, inserting it if needed."""
+    return upsert_id(session, SearchTerm, term=term)
 
 
 def run_clinical_trials_query(query: str, max_records: int = 9999) -> int:
@@ -310,24 +649,27 @@ def run_clinical_trials_query(query: str, max_records: int = 9999) -> int:
     Main function to run a ClinicalTrials.gov query, fetch data, and store it.
     Returns the number of new trials downloaded.
     """
+    # Connect to the API in the background while the database is set up
+    api = create_api(warmup=True)
     create_tables()
     session = get_session()
+    pages = None
+    new_count = 0
 
     try:
-        norm_query = normalize_query(query)
-        search_term = session.query(SearchTerm).filter_by(term=norm_query).first()
-        if not search_term:
-            logger.info(f"Creating new search entry for query: '{query}'")
-            search_term = SearchTerm(term=norm_query)
-            session.add(search_term)
-            session.commit()
-        else:
-            logger.info(f"✔️ Using existing search entry for query: '{query}'")
+        search_term_id = get_or_create_search_term(session, normalize_query(query))
+        session.commit()
+        logger.info(f"✔️ Using search entry {search_term_id} for query: '{query}'")
 
         logger.info(f"Searching ClinicalTrials.gov for query: '{query}'...")
-        data = fetch_all_trials(query, page_size=config.CHUNK_SIZE)
-        all_studies = data["studies"]
-        count = data["totalCount"]
+        pages = iter_trial_pages(
+            query,
+            page_size=config.CHUNK_SIZE,
+            api=api,
+            max_pages=-(-max_records // config.CHUNK_SIZE),
+        )
+        first_page = next(pages, None)
+        count = first_page.get("totalCount", 0) if first_page else 0
 
         if count == 0:
             logger.info("No trials found for this query.")
@@ -339,53 +681,39 @@ def run_clinical_trials_query(query: str, max_records: int = 9999) -> int:
             logger.warning(
                 f"Query returned {count} results, but only fetching the first {max_records} as requested."
             )
-            all_studies = all_studies[:max_records]
 
-        nct_ids = [
-            study["protocolSection"]["identificationModule"]["nctId"]
-            for study in all_studies
-            if "protocolSection" in study
-            and "identificationModule" in study["protocolSection"]
-        ]
-        existing_nct_ids = {
-            res[0]
-            for res in session.query(ClinicalTrial.nct_id)
-            .filter(ClinicalTrial.nct_id.in_(nct_ids))
-            .all()
-        }
-        logger.info(
-            f"Found {len(existing_nct_ids)} trials already in the database."
+        # Trials are stored and committed as pages stream in, so memory is
+        # bounded by BATCH_SIZE and an interruption keeps what was stored.
+        studies = islice(
+            (study for page in chain([first_page], pages) for study in page.get("studies", [])),
+            max_records,
         )
-
-        for nct_id in existing_nct_ids:
-            session.merge(SearchToTrial(search_id=search_term.id, nct_id=nct_id))
-        session.commit()
-
-        new_studies = [
-            study
-            for study in all_studies
-            if "protocolSection" in study
-            and "identificationModule" in study["protocolSection"]
-            and study["protocolSection"]["identificationModule"]["nctId"]
-            not in existing_nct_ids
-        ]
-        logger.info(f"🔍 Processing and storing {len(new_studies)} new trials...")
-
-        if not new_studies:
+        with ProcessPoolExecutor(config.PARSE_WORKERS) if config.PARSE_WORKERS else nullcontext() as executor:
+            for batch in batched(studies, config.BATCH_SIZE):
+                with session.no_autoflush:
+                    new_count += store_trials(session, batch, search_term_id, executor)
+                session.commit()
+                session.expunge_all()
+
+        if not new_count:
             logger.info("✅ All found trials were already in the database.")
             return 0
 
-        for study in tqdm(new_studies, desc="Storing Trials"):
-            process_and_store_trial(session, study, search_term.id)
-
-        session.commit()
         logger.info("✅ Download and processing complete.")
-        return len(new_studies)
+        return new_count
 
     except Exception as e:
-        logger.exception(f"An unexpected error occurred during the process: {e}")
         session.rollback()
-        return 0
+        if new_count:
+            # Earlier batches were committed as they were stored, so the harvest is partial, not lost
+            logger.exception(f"Harvest stopped partway, after storing {new_count} new trials: {e}")
+        else:
+            logger.exception(f"An unexpected error occurred during the process: {e}")
+        return new_count
     finally:
+        # Stops the page prefetcher and releases the HTTP and database connections
+        if pages is not None:
+            pages.close()
+        api.close()
         session.close()
         logger.info("Database session closed.")
@@ -1,5 +1,7 @@
 """Database models for Clinical Trials Miner."""
 
+from functools import lru_cache
+
 from sqlalchemy import (
     JSON,
     Boolean,
@@ -7,15 +9,21 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     create_engine,
+    event,
     func,
 )
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
-from .config import DB_URL, ensure_dir_exists
+from loguru import logger
+
+from . import config
 
 Base = declarative_base()
 
@@ -135,6 +143,9 @@ class Intervention(Base):
     """Stores interventions (drugs, etc.)."""
 
     __tablename__ = "interventions"
+    # Interventions are resolved by (name, type), so the pair is unique and indexed;
+    # a missing type is stored as "" so the pair stays unique under SQLite's NULL rules
+    __table_args__ = (Index("uq_intervention_name_type", "name", "type", unique=True),)
     id = Column(Integer, primary_key=True)
     type = Column(String)
     name = Column(String)
@@ -146,6 +157,7 @@ class Arm(Base):
     """Stores trial arms."""
 
     __tablename__ = "arms"
+    __table_args__ = (Index("ix_arms_trial", "trial_nct_id"),)
     id = Column(Integer, primary_key=True)
     trial_nct_id = Column(String, ForeignKey("clinical_trials.nct_id"))
     label = Column(String)
@@ -169,6 +181,7 @@ class Outcome(Base):
     """Stores outcome measures."""
 
     __tablename__ = "outcomes"
+    __table_args__ = (Index("ix_outcomes_trial", "trial_nct_id"),)
     id = Column(Integer, primary_key=True)
     trial_nct_id = Column(String, ForeignKey("clinical_trials.nct_id"))
     type = Column(String)  # e.g., 'PRIMARY', 'SECONDARY'
@@ -182,6 +195,7 @@ class Location(Base):
     """Stores trial locations."""
 
     __tablename__ = "locations"
+    __table_args__ = (Index("ix_locations_trial", "trial_nct_id"),)
     id = Column(Integer, primary_key=True)
     trial_nct_id = Column(String, ForeignKey("clinical_trials.nct_id"))
     facility = Column(String, nullable=True)
@@ -198,6 +212,7 @@ class Reference(Base):
     """Stores references."""
 
     __tablename__ = "references"
+    __table_args__ = (Index("ix_references_trial", "trial_nct_id"),)
     id = Column(Integer, primary_key=True)
     trial_nct_id = Column(String, ForeignKey("clinical_trials.nct_id"))
     pmid = Column(String, nullable=True)
@@ -223,6 +238,7 @@ class AdverseEvent(Base):
     """Stores adverse event data."""
 
     __tablename__ = "adverse_events"
+    __table_args__ = (Index("ix_adverse_events_trial", "trial_nct_id"),)
     id = Column(Integer, primary_key=True)
     trial_nct_id = Column(String, ForeignKey("clinical_trials.nct_id"))
     term = Column(String)
@@ -248,16 +264,47 @@ class SearchToTrial(Base):
     trial = relationship("ClinicalTrial", back_populates="searches")
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune SQLite for bulk loads: WAL journal, fewer fsyncs, in-memory temp storage."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+@lru_cache(maxsize=None)
+def _engine_for(db_url: str) -> Engine:
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def _session_factory(db_url: str) -> sessionmaker:
+    # The harvester writes through bulk statements and commits once per batch,
+    # so autoflush and post-commit expiry are pure overhead.
+    return sessionmaker(bind=_engine_for(db_url), autoflush=False, expire_on_commit=False)
+
+
 def get_engine():
     """Creates and returns a SQLAlchemy engine, ensuring the data directory exists."""
-    ensure_dir_exists()
-    return create_engine(DB_URL)
+    config.ensure_dir_exists()
+    return _engine_for(config.DB_URL)
 
 
 def create_tables():
     """Creates all database tables defined in the models."""
     engine = get_engine()
     Base.metadata.create_all(engine)
+    # create_all skips existing tables, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except IntegrityError:
+                logger.warning(f"Skipping index {index.name}: existing rows violate its uniqueness")
 
 
 def drop_tables():
@@ -268,6 +315,5 @@ def drop_tables():
 
 def get_session():
     """Creates and returns a new SQLAlchemy session."""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    config.ensure_dir_exists()
+    return _session_factory(config.DB_URL)()
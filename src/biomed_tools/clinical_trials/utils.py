@@ -2,13 +2,16 @@
 
 import re
 import time
-from typing import Any, Callable
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, TypeVar
 
 import requests
 from loguru import logger
 
 from ..clinical_trials import config
 
+T = TypeVar("T")
+
 
 def safe_request(url: str, params: dict) -> requests.Response:
     """
@@ -34,3 +37,12 @@ def normalize_query(query: str) -> str:
     Normalizes a search query by lowercasing and removing extra whitespace.
     """
     return " ".join(query.lower().split())
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Yields lists of up to `size` items from `iterable`.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -1,24 +1,55 @@
 from typing import Optional, Dict, Any
+import orjson
 import requests
+import requests_cache
 from loguru import logger
-from .config import API_BASE_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from . import config
 
 class DailyMedApi:
     """A wrapper class for the DailyMed REST API (v2)."""
 
     def __init__(self):
-        self.session = requests.Session()
-        self.base_url = API_BASE_URL
+        self.session = self._create_session()
+        self.session.headers.update(config.HTTP_HEADERS)
+        self.base_url = config.API_BASE_URL
+        # Pooled keep-alive connections, with transient failures retried in the adapter
+        retry = Retry(
+            total=config.MAX_RETRIES,
+            backoff_factor=config.RETRY_BACKOFF,
+            status_forcelist=config.RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_connections=config.POOL_CONNECTIONS, pool_maxsize=config.POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Returns a session backed by the local HTTP cache, unless caching is disabled."""
+        if not config.CACHE_ENABLED:
+            return requests.Session()
+
+        config.ensure_dir_exists()
+        return requests_cache.CachedSession(
+            cache_name=str(config.CACHE_PATH),
+            backend="sqlite",
+            expire_after=config.CACHE_EXPIRE_AFTER,
+            allowable_methods=["GET"],
+            cache_control=True,
+        )
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None, return_json: bool = True) -> Any:
         url = f"{self.base_url}/{endpoint}"
         try:
-            response = self.session.get(url, params=params)
+            response = self.session.get(url, params=params, timeout=config.REQUEST_TIMEOUT)
             response.raise_for_status()
             if return_json:
-                return response.json()
+                return orjson.loads(response.content)
             return response.content
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             logger.error(f"Error fetching data from {url}: {e}")
             return None
 
@@ -11,6 +11,11 @@ def add_subparsers(subparsers):
         "harvest", help="Download data from DailyMed."
     )
     parser_harvest.add_argument("query", help="The search query for drugs (e.g., 'tylenol').")
+    parser_harvest.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the local HTTP response cache.",
+    )
 
     # --- Clear command ---
     subparsers.add_parser("clear", help="Clear the database.")
@@ -23,6 +28,8 @@ def main(args):
     config.configure_logging()
 
     if args.subcommand == "harvest":
+        if args.no_cache:
+            config.CACHE_ENABLED = False
         harvester.run_daily_med_query(args.query)
     elif args.subcommand == "clear":
         logger.info("Clearing the database...")
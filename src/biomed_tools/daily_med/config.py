@@ -1,14 +1,32 @@
 """Configuration constants for DailyMed Miner."""
 
+from datetime import timedelta
 from pathlib import Path
 from loguru import logger
 
 # --- Core Settings ---
 DB_URL = "sqlite:///db/daily_med.db"
 LOG_FILE = Path("logs") / "daily_med.log"
+CACHE_PATH = Path("cache") / "daily_med_http"
 
 # --- DailyMed API Settings ---
 API_BASE_URL = "https://dailymed.nlm.nih.gov/dailymed/services/v2"
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+REQUEST_TIMEOUT = 30.0  # Seconds; without one a stalled pooled socket hangs its worker
+MAX_WORKERS = 8  # Concurrent page requests when fetching search results
+BATCH_SIZE = 1000  # Rows per bulk upsert statement
+HTTP_HEADERS = {
+    "Accept-Encoding": "gzip, deflate, br",  # br needs the brotli package
+    "User-Agent": "biomed_tools (+https://github.com/bwilks-mediar/biomed_tools)",
+}
+
+# --- HTTP Cache Settings ---
+CACHE_ENABLED = True  # Disabled by `harvest --no-cache`
+CACHE_EXPIRE_AFTER = timedelta(days=1)  # Unless the server's Cache-Control says otherwise
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
@@ -24,6 +42,7 @@ def ensure_dir_exists():
     db_path = get_db_path()
     db_path.parent.mkdir(parents=True, exist_ok=True)
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 _logging_configured = False
 
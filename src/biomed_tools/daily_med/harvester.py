@@ -1,9 +1,15 @@
 """Core logic for fetching and processing DailyMed data."""
 
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
 from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
+from .._sql import upsert_id
 from . import config
 from .api import DailyMedApi
 from .models import (
@@ -17,54 +23,95 @@ from .utils import normalize_query
 # Configure logging when module is imported
 config.configure_logging()
 
-def process_and_store_drug(session: Session, drug_data: dict):
+def drug_row(drug_data: dict) -> Optional[dict]:
     """
-    Processes a single drug entry and stores it into the database.
+    Maps a drug entry from the SPL search to a `drugs` row, or None if it has
+    no Set ID.
     """
     set_id = drug_data.get("setid")
-    # 'title' seems to be the name in spls.json response
-    drug_name = drug_data.get("title") or drug_data.get("drug_name")
-    
     if not set_id:
-        return
+        return None
+    return {
+        "set_id": set_id,
+        # 'title' seems to be the name in spls.json response
+        "drug_name": drug_data.get("title") or drug_data.get("drug_name"),
+        "spl_version": drug_data.get("spl_version"),
+        "published_date": drug_data.get("published_date"),
+    }
+
 
-    drug = Drug(
-        set_id=set_id,
-        drug_name=drug_name,
-        spl_version=drug_data.get("spl_version"),
-        published_date=drug_data.get("published_date"),
+def store_drugs(session: Session, drugs: List[dict]):
+    """
+    Upserts drug entries with one INSERT ... ON CONFLICT DO UPDATE executemany
+    per BATCH_SIZE rows, instead of a merge (SELECT then INSERT/UPDATE) per drug.
+    A Set ID repeated in the input keeps its last entry, as successive merges did.
+    """
+    rows = {row["set_id"]: row for row in map(drug_row, drugs) if row}
+    if not rows:
+        return
+    table = Drug.__table__
+    upsert = insert(table)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[table.c.set_id],
+        set_={
+            "drug_name": upsert.excluded.drug_name,
+            "spl_version": upsert.excluded.spl_version,
+            "published_date": upsert.excluded.published_date,
+            "timestamp": func.now(),
+        },
     )
-    session.merge(drug)
+    values = list(rows.values())
+    # Progress advances once per batch, so the bar costs nothing per row
+    with tqdm(total=len(values), desc="Storing Drugs", unit="drug") as pbar:
+        for start in range(0, len(values), config.BATCH_SIZE):
+            batch = values[start:start + config.BATCH_SIZE]
+            session.execute(upsert, batch)
+            pbar.update(len(batch))
+
+
+def process_and_store_drug(session: Session, drug_data: dict):
+    """
+    Processes a single drug entry and stores it into the database.
+    """
+    store_drugs(session, [drug_data])
 
 def fetch_all_spls(api: DailyMedApi, query: str, page_size: int = 100) -> list:
     """
-    Fetch all SPLs matching the query by paginating.
+    Fetch all SPLs matching the query. The first page gives the page count;
+    the remaining pages are independent, so they are fetched concurrently
+    (MAX_WORKERS at a time) over the API's pooled session.
     """
-    all_spls = []
-    page = 1
-    total_pages = 1
-    
-    with tqdm(desc="Fetching pages", unit="page") as pbar:
-        while page <= total_pages:
-            result = api.search_spls(query, page=page, page_size=page_size)
+    first = api.search_spls(query, page=1, page_size=page_size)
+    if not first or "data" not in first:
+        return []
+
+    all_spls = list(first["data"])
+    total_pages = first.get("metadata", {}).get("total_pages", 0)
+
+    def fetch_page(page: int):
+        return api.search_spls(query, page=page, page_size=page_size)
+
+    with tqdm(desc="Fetching pages", unit="page", total=total_pages) as pbar, \
+         ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+        pbar.update(1)
+        futures = [executor.submit(fetch_page, page) for page in range(2, total_pages + 1)]
+        # Collected in page order, stopping at the first failed page as the serial loop did
+        for future in futures:
+            result = future.result()
             if not result or "data" not in result:
+                for pending in futures:
+                    pending.cancel()
                 break
-            
-            data = result["data"]
-            all_spls.extend(data)
-            
-            metadata = result.get("metadata", {})
-            total_pages = metadata.get("total_pages", 0)
-            
-            # Update pbar total if it's the first page
-            if page == 1:
-                pbar.total = total_pages
-            
+            all_spls.extend(result["data"])
             pbar.update(1)
-            page += 1
-            
+
     return all_spls
 
+def get_or_create_search_term(session: Session, term: str) -> int:
+    """Returns the id of the search term, inserting it if needed."""
+    return upsert_id(session, SearchTerm, term=term)
+
+
 def run_daily_med_query(query: str) -> int:
     """
     Main function to run a DailyMed query, fetch data, and store it.
@@ -75,15 +122,9 @@ def run_daily_med_query(query: str) -> int:
     api = DailyMedApi()
 
     try:
-        norm_query = normalize_query(query)
-        search_term = session.query(SearchTerm).filter_by(term=norm_query).first()
-        if not search_term:
-            logger.info(f"Creating new search entry for query: '{query}'")
-            search_term = SearchTerm(term=norm_query)
-            session.add(search_term)
-            session.commit()
-        else:
-            logger.info(f"Using existing search entry for query: '{query}'")
+        search_id = get_or_create_search_term(session, normalize_query(query))
+        session.commit()
+        logger.info(f"Using search entry {search_id} for query: '{query}'")
 
         logger.info(f"Searching DailyMed SPLs for query: '{query}'...")
         
@@ -97,8 +138,7 @@ def run_daily_med_query(query: str) -> int:
 
         logger.info(f"Found {count} drugs/SPLs for this query.")
 
-        for drug_data in tqdm(drugs, desc="Storing Drugs"):
-            process_and_store_drug(session, drug_data)
+        store_drugs(session, drugs)
 
         session.commit()
         logger.info("✅ Download and processing complete.")
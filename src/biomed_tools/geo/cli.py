@@ -29,10 +29,13 @@ def main(args):
         harvester.download_geometadb()
     elif args.subcommand == "query":
         if args.keyword:
-            df = utils.find_gse_by_keyword(args.keyword)
-            if not df.empty:
-                print(df)
-            else:
+            # Printed chunk by chunk, so broad keywords don't load every match at once
+            found = 0
+            for chunk in utils.iter_gse_by_keyword(args.keyword):
+                if not chunk.empty:
+                    print(chunk.to_string(index=False, header=not found))
+                    found += len(chunk)
+            if not found:
                 logger.info("No results found.")
         else:
             logger.warning("Please provide a keyword to query.")
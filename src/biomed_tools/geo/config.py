@@ -7,6 +7,9 @@ from loguru import logger
 # --- Core Settings ---
 DB_URL = "sqlite:///db/GEOmetadb.sqlite"
 LOG_FILE = Path("logs") / "geo.log"
+COPY_BUFFER_SIZE = 256 * 1024  # Bytes per read when decompressing the download
+READ_AHEAD_CHUNKS = 16  # Compressed chunks buffered while the previous ones are inflated
+QUERY_CHUNK_SIZE = 5000  # Rows per DataFrame when streaming keyword search results
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
@@ -1,15 +1,77 @@
 """Harvester for GEOmetadb."""
 
-import gzip
-import shutil
+import queue
+import threading
+import zlib
+
 import requests
 from loguru import logger
 
-from . import config
+from . import config, utils
 
 # Configure logging when module is imported
 config.configure_logging()
 
+def gunzip_stream(raw, f_out, chunk_size: int = config.COPY_BUFFER_SIZE):
+    """
+    Decompress a gzip stream into `f_out`, reading the compressed input on a
+    background thread so network reads overlap with inflating and writing
+    (socket reads and zlib both release the GIL). zlib checks each member's
+    CRC32 and length trailer as it is reached, so a corrupt download fails
+    here, during the transfer, rather than in a later pass.
+    """
+    chunks = queue.Queue(maxsize=config.READ_AHEAD_CHUNKS)
+    errors = []
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Gives up once decompression has stopped, so the reader can't be left blocked
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            while not stop.is_set() and (chunk := raw.read(chunk_size)):
+                if not put(chunk):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(None)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    try:
+        while (chunk := chunks.get()) is not None:
+            while chunk:
+                f_out.write(decompressor.decompress(chunk))
+                # A new gzip member starts after the end of the previous one
+                chunk = decompressor.unused_data
+                if chunk:
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    finally:
+        # Stops the transfer on a corrupt stream, failed write or Ctrl-C instead
+        # of reading the rest of the download before the error surfaces
+        stop.set()
+        while True:
+            try:
+                chunks.get_nowait()
+            except queue.Empty:
+                break
+        reader.join()
+    if errors:
+        raise errors[0]
+    f_out.write(decompressor.flush())
+    if not decompressor.eof:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+
 def download_geometadb():
     """Download the GEOmetadb SQLite file."""
     config.ensure_dir_exists()
@@ -17,33 +79,27 @@ def download_geometadb():
     
     if db_path.exists():
         logger.info(f"GEOmetadb.sqlite already exists at {db_path}")
+        utils.build_gse_fts(db_path)
         return
 
     # URL from GEOmetadb R package
     url = "https://gbnci.cancer.gov/geo/GEOmetadb.sqlite.gz"
-    gz_path = db_path.with_suffix(".sqlite.gz")
-    
-    logger.info(f"Downloading GEOmetadb from {url}...")
+
+    logger.info(f"Downloading and extracting GEOmetadb from {url}...")
     try:
+        # Decompress the response stream straight into the database file, so the
+        # multi-GB .gz is never written to disk and read back
         with requests.get(url, stream=True) as r:
             r.raise_for_status()
-            with open(gz_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
-        logger.info("Extracting GEOmetadb.sqlite.gz...")
-        with gzip.open(gz_path, 'rb') as f_in:
-            with open(db_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-        
-        # Cleanup gz file
-        gz_path.unlink()
+            r.raw.decode_content = False
+            with open(db_path, "wb") as f_out:
+                gunzip_stream(r.raw, f_out)
+
         logger.info("GEOmetadb.sqlite downloaded and extracted successfully.")
-        
+        utils.build_gse_fts(db_path)
+
     except Exception as e:
         logger.error(f"Failed to download GEOmetadb: {e}")
-        if gz_path.exists():
-            gz_path.unlink()
         if db_path.exists():
             db_path.unlink()
         raise
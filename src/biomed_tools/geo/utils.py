@@ -1,34 +1,93 @@
 """Utility functions for the GEO miner."""
 
 import sqlite3
+from pathlib import Path
+from typing import Iterator, Optional
+
 import pandas as pd
 from loguru import logger
 
 from . import config
 
-def find_gse_by_keyword(keyword: str) -> pd.DataFrame:
-    """Find GEO series by keyword."""
+# Trigram tokens make MATCH a case-insensitive substring search, like LIKE '%keyword%'
+FTS_TABLE = "gse_fts"
+MIN_FTS_KEYWORD_LENGTH = 3  # Trigram indexes can't match anything shorter
+
+
+def _has_fts(con: sqlite3.Connection) -> bool:
+    return con.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)).fetchone() is not None
+
+
+def build_gse_fts(db_path: Optional[Path] = None):
+    """
+    Build a full-text index over GSE titles and summaries, unless it exists.
+    The index stores no copy of the text (it reads it from the gse table).
+    """
+    db_path = db_path or config.get_db_path()
+    con = sqlite3.connect(db_path)
+    try:
+        if _has_fts(con):
+            return
+        logger.info("Building the GSE full-text index...")
+        # One transaction, so a failed build leaves no half-built index behind
+        con.executescript(f"""
+            BEGIN;
+            CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                gse UNINDEXED, title, summary, content='gse', content_rowid='rowid', tokenize='trigram'
+            );
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild');
+            COMMIT;
+        """)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not build the GSE full-text index, keyword search will scan the table: {e}")
+    finally:
+        con.close()
+
+
+def iter_gse_by_keyword(keyword: str, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the GEO series whose title or summary contains the keyword, as
+    DataFrames of up to chunksize rows (QUERY_CHUNK_SIZE by default), so a
+    broad keyword never holds every matching summary in memory at once. Uses
+    the full-text index when it exists, instead of scanning every row.
+    """
     db_path = config.get_db_path()
     if not db_path.exists():
         logger.error(f"Database file not found at {db_path}. Please run 'harvest' first.")
-        return pd.DataFrame()
+        return
 
     con = sqlite3.connect(db_path)
-    
-    query = """
-        SELECT gse, title, summary 
-        FROM gse 
-        WHERE title LIKE ? 
-        OR summary LIKE ?
-    """
-    params = (f'%{keyword}%', f'%{keyword}%')
-    
+
     try:
-        df = pd.read_sql_query(query, con, params=params)
+        if len(keyword) >= MIN_FTS_KEYWORD_LENGTH and _has_fts(con):
+            query = f"""
+                SELECT gse, title, summary
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH ?
+            """
+            # Quoted as a phrase so the keyword isn't parsed as FTS query syntax
+            params = ('"' + keyword.replace('"', '""') + '"',)
+        else:
+            query = """
+                SELECT gse, title, summary 
+                FROM gse 
+                WHERE title LIKE ? 
+                OR summary LIKE ?
+            """
+            params = (f'%{keyword}%', f'%{keyword}%')
+        yield from pd.read_sql_query(query, con, params=params, chunksize=chunksize or config.QUERY_CHUNK_SIZE)
     except Exception as e:
         logger.error(f"Error querying database: {e}")
-        df = pd.DataFrame()
     finally:
         con.close()
-    
-    return df
+
+
+def find_gse_by_keyword(keyword: str) -> pd.DataFrame:
+    """
+    Find GEO series whose title or summary contains the keyword, as one
+    DataFrame. See iter_gse_by_keyword to process large results in chunks.
+    """
+    chunks = list(iter_gse_by_keyword(keyword))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
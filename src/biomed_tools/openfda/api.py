@@ -3,6 +3,7 @@
 import time
 from typing import Any, Dict, Optional
 
+import orjson
 import requests
 from loguru import logger
 
@@ -13,6 +14,7 @@ class OpenFDAAPI:
 
     def __init__(self):
         self.session = requests.Session()
+        self.session.headers.update(config.HTTP_HEADERS)
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
         url = f"{self.BASE_URL}/{endpoint}"
@@ -24,7 +26,10 @@ class OpenFDAAPI:
                     logger.info(f"No results found for query.")
                     return None
                 response.raise_for_status()
-                return response.json()
+                return orjson.loads(response.content)
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Invalid JSON from {url}: {e}")
+                return None
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Request failed (attempt {attempt + 1}/{config.MAX_RETRIES}): {e}")
                 if attempt < config.MAX_RETRIES - 1:
@@ -14,9 +14,10 @@ def add_subparsers(subparsers):
     parser_harvest.add_argument(
         "--endpoint",
         type=str,
-        default="event",
-        choices=["event", "label", "ndc", "enforcement", "drugsfda"],
-        help="OpenFDA endpoint to query (default: event)."
+        nargs="+",
+        default=["event"],
+        choices=list(openfda.harvester.ENDPOINTS),
+        help="OpenFDA endpoint(s) to query (default: event). Several endpoints are harvested concurrently."
     )
     parser_harvest.add_argument(
         "--max-records",
@@ -30,6 +31,11 @@ def main(args):
     openfda.config.configure_logging()
 
     if args.subcommand == "harvest":
-        openfda.harvester.run_openfda_query(
-            args.query, endpoint=args.endpoint, max_records=args.max_records
-        )
+        if len(args.endpoint) == 1:
+            openfda.harvester.run_openfda_query(
+                args.query, endpoint=args.endpoint[0], max_records=args.max_records
+            )
+        else:
+            openfda.harvester.run_openfda_queries(
+                args.query, endpoints=args.endpoint, max_records=args.max_records
+            )
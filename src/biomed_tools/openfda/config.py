@@ -14,6 +14,12 @@ API_BASE_URL = "https://api.fda.gov/drug"
 CHUNK_SIZE = 100  
 MAX_RETRIES = 3
 RETRY_BACKOFF = 2.0
+BATCH_SIZE = 1000  # Records per bulk upsert
+MAX_WORKERS = 8  # Concurrent page requests; keep under the 240 requests/minute keyless limit
+HTTP_HEADERS = {
+    "Accept-Encoding": "gzip, deflate, br",  # br needs the brotli package
+    "User-Agent": "biomed_tools (+https://github.com/bwilks-mediar/biomed_tools)",
+}
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
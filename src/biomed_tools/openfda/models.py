@@ -1,22 +1,29 @@
 """Database models for OpenFDA module."""
 
+from functools import lru_cache
+
+import orjson
+
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     JSON,
     create_engine,
+    event,
     func,
     UniqueConstraint
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
-from .config import DB_URL, ensure_dir_exists
+from . import config
 
 Base = declarative_base()
 
@@ -72,6 +79,8 @@ class DrugEvent(Base):
 class DrugEventDrug(Base):
     """Drugs involved in the adverse event."""
     __tablename__ = "drug_event_drugs"
+    # Each batch deletes its events' children before reinserting them, so look them up by event
+    __table_args__ = (Index("ix_drug_event_drugs_event", "safetyreportid"),)
     id = Column(Integer, primary_key=True)
     safetyreportid = Column(String, ForeignKey("drug_events.safetyreportid"))
     
@@ -90,6 +99,7 @@ class DrugEventDrug(Base):
 class DrugEventReaction(Base):
     """Reactions reported in the adverse event."""
     __tablename__ = "drug_event_reactions"
+    __table_args__ = (Index("ix_drug_event_reactions_event", "safetyreportid"),)
     id = Column(Integer, primary_key=True)
     safetyreportid = Column(String, ForeignKey("drug_events.safetyreportid"))
     
@@ -201,18 +211,46 @@ class SearchToDrugsFDA(Base):
     search = relationship("SearchTerm", back_populates="drugsfda")
     drugsfda = relationship("DrugAtFDA", back_populates="searches")
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune SQLite for bulk loads: WAL journal, fewer fsyncs, bigger cache, in-memory temp storage."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")  # ~64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+def _json_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+@lru_cache(maxsize=None)
+def _engine_for(db_url: str) -> Engine:
+    # The data columns hold whole API records; orjson serializes them several times faster than json
+    engine = create_engine(db_url, json_serializer=_json_dumps, json_deserializer=orjson.loads)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=None)
+def _session_factory(db_url: str) -> sessionmaker:
+    return sessionmaker(bind=_engine_for(db_url), expire_on_commit=False)
+
 def get_engine():
-    """Creates and returns a SQLAlchemy engine, ensuring the data directory exists."""
-    ensure_dir_exists()
-    return create_engine(DB_URL)
+    """Returns the engine for the configured database, created once per DB_URL."""
+    config.ensure_dir_exists()
+    return _engine_for(config.DB_URL)
 
 def create_tables():
     """Creates all database tables defined in the models."""
     engine = get_engine()
     Base.metadata.create_all(engine)
+    # create_all skips existing tables, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def get_session():
     """Creates and returns a new SQLAlchemy session."""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    config.ensure_dir_exists()
+    return _session_factory(config.DB_URL)()
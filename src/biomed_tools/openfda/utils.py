@@ -1,7 +1,5 @@
 """Utility functions for OpenFDA module."""
 
-import re
-
 def normalize_query(query: str) -> str:
     """
     Normalizes a search query for consistent storage and retrieval.
@@ -9,6 +7,4 @@ def normalize_query(query: str) -> str:
     """
     if not query:
         return ""
-    # Replace multiple spaces with single space
-    query = re.sub(r'\s+', ' ', query)
-    return query.strip().lower()
+    return " ".join(query.lower().split())
@@ -1,5 +1,6 @@
 """Configuration constants for Orange Book Miner."""
 
+import os
 from pathlib import Path
 from loguru import logger
 
@@ -11,6 +12,11 @@ DATA_DIR = Path("orange_book_data")
 # --- Orange Book Settings ---
 DATA_URL = "https://www.fda.gov/media/76860/download?attachment"
 MAX_AGE_DAYS = 30
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes per write when streaming the zip to disk
+INSERT_BATCH_SIZE = 1000  # Rows per executemany when loading tables
+# NORMAL is durable under WAL except for the last commits on power loss. OFF skips
+# fsync entirely and is only safe because a failed harvest can simply be rerun.
+SQLITE_SYNCHRONOUS = os.environ.get("ORANGE_BOOK_SQLITE_SYNCHRONOUS", "NORMAL")
 
 # --- Logging Configuration ---
 LOG_LEVEL = "INFO"
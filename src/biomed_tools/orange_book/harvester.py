@@ -1,6 +1,10 @@
 """Core logic for fetching and processing Orange Book data."""
 
+from typing import List
+
 import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 from loguru import logger
@@ -18,9 +22,31 @@ from .models import (
 # Configure logging when module is imported
 config.configure_logging()
 
+def _execute_batches(session: Session, statement, rows: List[dict], desc: str):
+    """Executes the statement over the rows, one executemany per INSERT_BATCH_SIZE rows."""
+    # disable=None hides the bar when stderr isn't a terminal (logs, CI)
+    with tqdm(total=len(rows), desc=desc, mininterval=0.5, disable=None) as pbar:
+        for start in range(0, len(rows), config.INSERT_BATCH_SIZE):
+            batch = rows[start:start + config.INSERT_BATCH_SIZE]
+            session.execute(statement, batch)
+            pbar.update(len(batch))
+
+def _records(df: pd.DataFrame, column_map: dict) -> List[dict]:
+    """
+    Converts a source DataFrame to row dicts for insertion, renaming columns
+    and turning missing values into None. Works a column at a time, which
+    avoids materializing a whole-frame mask and is several times faster than
+    df.where(...).to_dict('records').
+    """
+    columns = {
+        column_map.get(name, name): df[name].astype(object).where(df[name].notna(), None).tolist()
+        for name in df.columns
+    }
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
 def load_products(session: Session, products_df: pd.DataFrame):
     """Loads products into the database."""
-    # Rename columns to match model
+    # Source columns to model columns
     column_map = {
         'Ingredient': 'ingredient',
         'DF;Route': 'df_route',
@@ -37,21 +63,25 @@ def load_products(session: Session, products_df: pd.DataFrame):
         'Type': 'type',
         'Applicant_Full_Name': 'applicant_full_name'
     }
-    products_df = products_df.rename(columns=column_map)
-    
-    # Fill NaN with None or empty string
-    products_df = products_df.where(pd.notnull(products_df), None)
+    products_data = _records(products_df, column_map)
     
-    # Convert to list of dicts
-    products_data = products_df.to_dict(orient='records')
-    
-    # Bulk save might be faster, but merge handles updates
-    # Given the size, let's try to upsert individually or use bulk_save_objects if we wipe first
-    # Since we are likely doing a full refresh, wiping tables might be better.
-    
-    for row in tqdm(products_data, desc="Loading Products"):
-        product = Product(**row)
-        session.merge(product)
+    # One executemany upsert instead of a merge (SELECT then INSERT/UPDATE) per row.
+    # On a full refresh nothing conflicts, so it costs the same as a plain insert;
+    # otherwise existing products are updated, and a repeated key keeps its last row.
+    table = Product.__table__
+    upsert = insert(table)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={
+            **{
+                column.name: upsert.excluded[column.name]
+                for column in table.columns
+                if not column.primary_key and column.name != "timestamp"
+            },
+            "timestamp": func.now(),
+        },
+    )
+    _execute_batches(session, upsert, products_data, "Loading Products")
 
 def load_patents(session: Session, patent_df: pd.DataFrame):
     """Loads patents into the database."""
@@ -67,17 +97,11 @@ def load_patents(session: Session, patent_df: pd.DataFrame):
         'Delist_Flag': 'delist_flag',
         'Submission_Date': 'submission_date'
     }
-    patent_df = patent_df.rename(columns=column_map)
-    patent_df = patent_df.where(pd.notnull(patent_df), None)
-    
-    patents_data = patent_df.to_dict(orient='records')
+    patents_data = _records(patent_df, column_map)
     
-    for row in tqdm(patents_data, desc="Loading Patents"):
-        # We don't have a unique ID for patents in the source, so we can just add them.
-        # But if we merge, we need a PK.
-        # Since we might wipe tables, just adding is fine.
-        patent = Patent(**row)
-        session.add(patent)
+    # Patents have no natural key in the source, so they are plainly inserted,
+    # in one executemany rather than an ORM object per row
+    _execute_batches(session, insert(Patent.__table__), patents_data, "Loading Patents")
 
 def load_exclusivity(session: Session, exclusivity_df: pd.DataFrame):
     """Loads exclusivity data into the database."""
@@ -88,14 +112,9 @@ def load_exclusivity(session: Session, exclusivity_df: pd.DataFrame):
         'Exclusivity_Code': 'exclusivity_code',
         'Exclusivity_Date': 'exclusivity_date'
     }
-    exclusivity_df = exclusivity_df.rename(columns=column_map)
-    exclusivity_df = exclusivity_df.where(pd.notnull(exclusivity_df), None)
+    exclusivity_data = _records(exclusivity_df, column_map)
     
-    exclusivity_data = exclusivity_df.to_dict(orient='records')
-    
-    for row in tqdm(exclusivity_data, desc="Loading Exclusivity"):
-        excl = Exclusivity(**row)
-        session.add(excl)
+    _execute_batches(session, insert(Exclusivity.__table__), exclusivity_data, "Loading Exclusivity")
 
 def harvest(force_download: bool = False, full_refresh: bool = True):
     """
@@ -131,15 +150,15 @@ def harvest(force_download: bool = False, full_refresh: bool = True):
             drop_tables()
             create_tables()
         
-        load_products(session, products_df)
-        load_patents(session, patent_df)
-        load_exclusivity(session, exclusivity_df)
-        
-        session.commit()
+        # One transaction for the whole load: committed once at the end, rolled back on error
+        with session.begin():
+            load_products(session, products_df)
+            load_patents(session, patent_df)
+            load_exclusivity(session, exclusivity_df)
+
         logger.info("Harvest complete.")
         
     except Exception as e:
         logger.exception(f"An unexpected error occurred: {e}")
-        session.rollback()
     finally:
         session.close()
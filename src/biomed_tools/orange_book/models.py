@@ -1,5 +1,7 @@
 """Database models for Orange Book Miner."""
 
+from functools import lru_cache
+
 from sqlalchemy import (
     Column,
     String,
@@ -8,12 +10,15 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     create_engine,
+    event,
     ForeignKeyConstraint,
+    Index,
     func,
     DateTime
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
-from .config import DB_URL, ensure_dir_exists
+from . import config
 
 Base = declarative_base()
 
@@ -70,6 +75,8 @@ class Patent(Base):
             ['appl_no', 'appl_type', 'product_no'],
             ['products.appl_no', 'products.appl_type', 'products.product_no'],
         ),
+        # SQLite doesn't index foreign keys, so joins to products would scan
+        Index('ix_patents_product', 'appl_no', 'appl_type', 'product_no'),
     )
 
     product = relationship("Product", back_populates="patents")
@@ -92,19 +99,48 @@ class Exclusivity(Base):
             ['appl_no', 'appl_type', 'product_no'],
             ['products.appl_no', 'products.appl_type', 'products.product_no'],
         ),
+        # SQLite doesn't index foreign keys, so joins to products would scan
+        Index('ix_exclusivity_product', 'appl_no', 'appl_type', 'product_no'),
     )
 
     product = relationship("Product", back_populates="exclusivity")
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune SQLite for bulk loads: WAL journal, fewer fsyncs, bigger cache, in-memory temp storage."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    synchronous = config.SQLITE_SYNCHRONOUS.upper()
+    cursor.execute(f"PRAGMA synchronous={synchronous if synchronous in ('OFF', 'NORMAL') else 'NORMAL'}")
+    cursor.execute("PRAGMA cache_size=-262144")  # ~256 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+@lru_cache(maxsize=None)
+def _engine_for(db_url: str) -> Engine:
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=None)
+def _session_factory(db_url: str) -> sessionmaker:
+    # The harvester loads through bulk statements in a single transaction, so
+    # autoflush and post-commit expiry are pure overhead.
+    return sessionmaker(bind=_engine_for(db_url), autoflush=False, expire_on_commit=False)
+
 def get_engine():
-    """Creates and returns a SQLAlchemy engine, ensuring the data directory exists."""
-    ensure_dir_exists()
-    return create_engine(DB_URL)
+    """Returns the engine for the configured database, created once per DB_URL."""
+    config.ensure_dir_exists()
+    return _engine_for(config.DB_URL)
 
 def create_tables():
     """Creates all database tables defined in the models."""
     engine = get_engine()
     Base.metadata.create_all(engine)
+    # create_all skips existing tables, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def drop_tables():
     """Drops all database tables defined in the models."""
@@ -113,6 +149,5 @@ def drop_tables():
 
 def get_session():
     """Creates and returns a new SQLAlchemy session."""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    config.ensure_dir_exists()
+    return _session_factory(config.DB_URL)()
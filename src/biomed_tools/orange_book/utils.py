@@ -3,7 +3,6 @@
 import time
 import requests
 import zipfile
-import io
 from pathlib import Path
 from loguru import logger
 from . import config
@@ -29,12 +28,19 @@ def download_data() -> None:
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
+    # Streamed to disk rather than buffered in memory, then extracted from there
+    zip_path = config.DATA_DIR / '_download.zip'
     try:
-        response = requests.get(config.DATA_URL, headers=headers)
-        response.raise_for_status()
-        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        with requests.get(config.DATA_URL, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            with open(zip_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=config.DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        with zipfile.ZipFile(zip_path) as z:
             z.extractall(config.DATA_DIR)
         logger.info("Download complete.")
     except Exception as e:
         logger.error(f"Failed to download data: {e}")
         raise
+    finally:
+        zip_path.unlink(missing_ok=True)
@@ -0,0 +1,15 @@
+import pytest
+from biomed_tools.chembl import api as chembl_api
+from biomed_tools.chembl import config as chembl_config
+from biomed_tools.clinical_trials import config as clinical_trials_config
+from biomed_tools.daily_med import config as daily_med_config
+
+
+@pytest.fixture(autouse=True)
+def isolated_http_cache(tmp_path, monkeypatch):
+    """Keeps requests_cache databases out of the working tree during tests."""
+    monkeypatch.setattr(clinical_trials_config, "CACHE_PATH", tmp_path / "clinical_trials_http")
+    monkeypatch.setattr(daily_med_config, "CACHE_PATH", tmp_path / "daily_med_http")
+    monkeypatch.setattr(chembl_config, "CACHE_PATH", tmp_path / "chembl_http")
+    # The ChEMBL session is process-wide, so drop it to rebuild against tmp_path
+    monkeypatch.setattr(chembl_api, "_shared_session", None)
@@ -1,5 +1,6 @@
 """Tests for ChEMBL Miner."""
 
+import orjson
 import pytest
 from unittest.mock import MagicMock, patch
 from biomed_tools.chembl.api import ChemblAPI
@@ -9,13 +10,13 @@ from biomed_tools.chembl import config
 def test_api_search_molecules():
     with patch("requests.Session") as mock_session:
         mock_response = MagicMock()
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "molecules": [{"molecule_chembl_id": "CHEMBL1"}],
             "page_meta": {"total_count": 1}
-        }
+        })
         mock_session.return_value.get.return_value = mock_response
 
-        api = ChemblAPI()
+        api = ChemblAPI(session=mock_session.return_value)
         data = api.search_molecules("aspirin")
         
         assert data["molecules"][0]["molecule_chembl_id"] == "CHEMBL1"
@@ -48,10 +49,11 @@ def test_run_chembl_query_integration(tmp_path):
             None # For subsequent call if loop continues
         ]
         
-        # Mock molecule_mechanisms response
-        mock_api_instance.molecule_mechanisms.return_value = {
-            "mechanisms": [
+        # Mock molecule_mechanisms_bulk response
+        mock_api_instance.molecule_mechanisms_bulk.return_value = {
+            "CHEMBL25": [
                 {
+                    "molecule_chembl_id": "CHEMBL25",
                     "mechanism_of_action": "COX inhibitor",
                     "target_name": "Cyclooxygenase",
                     "target_chembl_id": "CHEMBL123",
@@ -85,3 +87,119 @@ def test_run_chembl_query_integration(tmp_path):
         assert search_term.term == "aspirin"
         
         session.close()
+
+def test_fetch_all_molecules_pages_in_order():
+    from biomed_tools.chembl.harvester import fetch_all_molecules
+
+    def search(query, params=None):
+        offset = params["offset"]
+        return {
+            "molecules": [{"molecule_chembl_id": f"CHEMBL{offset + i}"} for i in range(config.CHUNK_SIZE)],
+            "page_meta": {"total_count": 3 * config.CHUNK_SIZE},
+        }
+
+    with patch("biomed_tools.chembl.harvester.ChemblAPI") as MockAPI:
+        MockAPI.return_value.search_molecules.side_effect = search
+        molecules = fetch_all_molecules("aspirin", max_records=100)
+
+    assert [m["molecule_chembl_id"] for m in molecules] == [f"CHEMBL{i}" for i in range(3 * config.CHUNK_SIZE)]
+
+def test_fetch_all_mechanisms_keys_by_id():
+    from biomed_tools.chembl.harvester import fetch_all_mechanisms
+
+    api = MagicMock()
+    api.molecule_mechanisms_bulk.side_effect = lambda ids: {cid: [{"target_chembl_id": f"T-{cid}"}] for cid in ids}
+
+    mechanisms = fetch_all_mechanisms(api, ["CHEMBL1", "CHEMBL2", "CHEMBL1"])
+
+    assert set(mechanisms) == {"CHEMBL1", "CHEMBL2"}
+    assert mechanisms["CHEMBL2"][0]["target_chembl_id"] == "T-CHEMBL2"
+    api.molecule_mechanisms_bulk.assert_called_once_with(["CHEMBL1", "CHEMBL2"])
+
+def test_api_molecule_mechanisms_bulk_groups_by_molecule():
+    session = MagicMock()
+    session.get.return_value.content = orjson.dumps({
+        "mechanisms": [
+            {"molecule_chembl_id": "CHEMBL1", "mechanism_of_action": "A"},
+            {"molecule_chembl_id": "CHEMBL1", "mechanism_of_action": "B"},
+        ],
+        "page_meta": {"next": None},
+    })
+
+    mechanisms = ChemblAPI(session=session).molecule_mechanisms_bulk(["CHEMBL1", "CHEMBL2"])
+
+    assert [m["mechanism_of_action"] for m in mechanisms["CHEMBL1"]] == ["A", "B"]
+    assert mechanisms["CHEMBL2"] == []
+    assert session.get.call_args.kwargs["params"]["molecule_chembl_id__in"] == "CHEMBL1,CHEMBL2"
+
+def test_store_molecules_upserts_and_replaces_children(tmp_path):
+    from biomed_tools.chembl.harvester import store_molecules
+    from biomed_tools.chembl.models import create_tables, get_session, Molecule, Mechanism, SearchTerm
+
+    config.DB_URL = f"sqlite:///{tmp_path / 'test_chembl_store.db'}"
+    create_tables()
+    session = get_session()
+    search_term = SearchTerm(term="aspirin")
+    session.add(search_term)
+    session.flush()
+
+    molecule = {"molecule_chembl_id": "CHEMBL25", "pref_name": "ASPIRIN"}
+    mechanisms = {"CHEMBL25": [{"mechanism_of_action": "COX inhibitor"}]}
+    store_molecules(session, [molecule], mechanisms, search_term.id)
+    store_molecules(session, [dict(molecule, pref_name="ACETYLSALICYLIC ACID")], mechanisms, search_term.id)
+    session.commit()
+
+    assert session.query(Molecule).one().pref_name == "ACETYLSALICYLIC ACID"
+    assert session.query(Mechanism).count() == 1
+    session.close()
+
+def test_iter_molecules_stops_at_max_records():
+    from biomed_tools.chembl.harvester import iter_molecules
+
+    def search(query, params=None):
+        offset = params["offset"]
+        return {
+            "molecules": [{"molecule_chembl_id": f"CHEMBL{offset + i}"} for i in range(config.CHUNK_SIZE)],
+            "page_meta": {"total_count": 10 * config.CHUNK_SIZE},
+        }
+
+    api = MagicMock()
+    api.search_molecules.side_effect = search
+    molecules = list(iter_molecules("aspirin", max_records=config.CHUNK_SIZE + 5, api=api))
+
+    assert len(molecules) == config.CHUNK_SIZE + 5
+    assert molecules[-1]["molecule_chembl_id"] == f"CHEMBL{config.CHUNK_SIZE + 4}"
+
+def test_molecule_to_rows_maps_api_fields():
+    from biomed_tools.chembl.harvester import molecule_to_rows
+    from biomed_tools.chembl.models import Molecule, MoleculeProperty, MoleculeCrossReference
+
+    rows = molecule_to_rows({
+        "molecule_chembl_id": "CHEMBL25",
+        "pref_name": "ASPIRIN",
+        "molecule_structures": {"standard_inchi_key": "BSYNRYMUTXBXSQ-UHFFFAOYSA-N"},
+        "molecule_properties": {"full_mwt": 180.16},
+        "cross_references": [{"xref_src": "Wikipedia", "xref_id": "Aspirin"}],
+    })
+
+    assert rows[Molecule][0]["inchi_key"] == "BSYNRYMUTXBXSQ-UHFFFAOYSA-N"
+    assert rows[MoleculeProperty][0]["chembl_id"] == "CHEMBL25"
+    assert rows[MoleculeProperty][0]["molecular_weight"] == 180.16
+    assert rows[MoleculeCrossReference][0]["xref_id_val"] == "Aspirin"
+
+def test_iter_molecules_skips_duplicates_across_pages():
+    from biomed_tools.chembl.harvester import iter_molecules
+
+    def search(query, params=None):
+        # Each page repeats the last molecule of the previous one
+        start = max(params["offset"] - 1, 0)
+        return {
+            "molecules": [{"molecule_chembl_id": f"CHEMBL{start + i}"} for i in range(config.CHUNK_SIZE)],
+            "page_meta": {"total_count": 2 * config.CHUNK_SIZE},
+        }
+
+    api = MagicMock()
+    api.search_molecules.side_effect = search
+    ids = [m["molecule_chembl_id"] for m in iter_molecules("aspirin", max_records=100, api=api)]
+
+    assert len(ids) == len(set(ids)) == 2 * config.CHUNK_SIZE - 1
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch, call
 from biomed_tools.clinical_trials import ClinicalTrialsAPI, config
+import orjson
 import requests
 import time
 
@@ -12,7 +13,7 @@ def test_list_studies(api):
     with patch.object(api.session, 'get') as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"studies": []}
+        mock_response.content = orjson.dumps({"studies": []})
         mock_get.return_value = mock_response
 
         studies = api.list_studies(params={"query.cond": "test"})
@@ -27,7 +28,7 @@ def test_fetch_study(api):
     with patch.object(api.session, 'get') as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"study": "data"}
+        mock_response.content = orjson.dumps({"study": "data"})
         mock_get.return_value = mock_response
 
         study = api.fetch_study("NCT123456")
@@ -36,38 +37,26 @@ def test_fetch_study(api):
         mock_get.assert_called_once()
         assert "studies/NCT123456" in mock_get.call_args[0][0]
 
-def test_retry_logic_success(api):
-    """Test that the API retries on failure and eventually succeeds."""
-    with patch.object(api.session, 'get') as mock_get, \
-         patch('time.sleep') as mock_sleep:  # Mock sleep to speed up tests
-        
-        # Fail twice, then succeed
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"success": True}
-        
-        mock_get.side_effect = [
-            requests.exceptions.RequestException("Fail 1"),
-            requests.exceptions.RequestException("Fail 2"),
-            mock_response
-        ]
-        
-        result = api._make_request("test")
-        
-        assert result == {"success": True}
-        assert mock_get.call_count == 3
+def test_session_retry_policy(api):
+    """Test that the session retries transient failures through the adapter."""
+    adapter = api.session.get_adapter(api.BASE_URL)
+    retry = adapter.max_retries
 
-def test_retry_logic_failure(api):
-    """Test that the API gives up after MAX_RETRIES."""
-    with patch.object(api.session, 'get') as mock_get, \
-         patch('time.sleep') as mock_sleep:
-        
-        mock_get.side_effect = requests.exceptions.RequestException("Fail always")
+    assert retry.total == config.MAX_RETRIES
+    assert retry.backoff_factor == config.RETRY_BACKOFF
+    assert 429 in retry.status_forcelist
+    assert retry.respect_retry_after_header
+    assert adapter._pool_maxsize == config.POOL_MAXSIZE
+
+def test_request_failure_returns_none(api):
+    """Test that the API returns None once the adapter gives up."""
+    with patch.object(api.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.RetryError("Max retries exceeded")
         
         result = api._make_request("test")
         
         assert result is None
-        assert mock_get.call_count == config.MAX_RETRIES
+        assert mock_get.call_count == 1
 
 def test_list_studies_paginated(api):
     """Test pagination logic."""
@@ -87,7 +76,15 @@ def test_list_studies_paginated(api):
             "studies": [{"id": 4}]
         }
         
-        mock_request.side_effect = [page1, page2, page3]
+        pages = iter([page1, page2, page3])
+        tokens = []
+
+        def make_request(endpoint, params):
+            # The params dict is reused across pages, so record the token at call time
+            tokens.append(params.get('pageToken'))
+            return next(pages)
+
+        mock_request.side_effect = make_request
         
         studies = api.list_studies_paginated(max_pages=5)
         
@@ -96,11 +93,7 @@ def test_list_studies_paginated(api):
         assert mock_request.call_count == 3
         
         # Verify calls had correct tokens
-        calls = mock_request.call_args_list
-        # Arguments are positional: _make_request("studies", params)
-        assert calls[0][0][1].get('pageToken') is None
-        assert calls[1][0][1]['pageToken'] == "token1"
-        assert calls[2][0][1]['pageToken'] == "token2"
+        assert tokens == [None, "token1", "token2"]
 
 def test_list_studies_paginated_limit(api):
     """Test that pagination stops at max_pages."""
@@ -115,3 +108,205 @@ def test_list_studies_paginated_limit(api):
         assert len(studies) == 1
         assert studies == [{"id": 1}]
         assert mock_request.call_count == 1
+
+def test_async_fetch_studies_bulk():
+    """Test that bulk fetches map each NCT ID to its study, with None for failures."""
+    import asyncio
+    import httpx
+    from biomed_tools.clinical_trials import AsyncClinicalTrialsAPI
+
+    requested = []
+
+    def handler(request):
+        nct_id = request.url.path.rsplit("/", 1)[-1]
+        requested.append(nct_id)
+        if nct_id == "NCT404":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"nctId": nct_id})
+
+    async def run():
+        api = AsyncClinicalTrialsAPI()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with api:
+            return await api.fetch_studies_bulk(["NCT001", "NCT002", "NCT404"])
+
+    with patch('asyncio.sleep'):
+        studies = asyncio.run(run())
+
+    assert studies["NCT001"] == {"nctId": "NCT001"}
+    assert studies["NCT002"] == {"nctId": "NCT002"}
+    assert studies["NCT404"] is None
+    assert requested.count("NCT404") == 1  # Client errors aren't retried
+
+def test_async_client_retries_retryable_statuses():
+    import asyncio
+    import httpx
+    from biomed_tools.clinical_trials import AsyncClinicalTrialsAPI
+
+    responses = iter([httpx.Response(503), httpx.Response(200, json={"nctId": "NCT001"})])
+
+    async def run():
+        api = AsyncClinicalTrialsAPI()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+        async with api:
+            return await api.fetch_study("NCT001")
+
+    with patch('asyncio.sleep'):
+        assert asyncio.run(run()) == {"nctId": "NCT001"}
+
+def test_retry_honors_retry_after():
+    """Test that a Retry-After header sets a floor on the backoff delay."""
+    from biomed_tools.clinical_trials.api import LoggedRetry
+
+    retry = LoggedRetry(total=3, backoff_factor=0.1, respect_retry_after_header=True)
+    response = MagicMock(status=429)
+    response.headers = {"Retry-After": "7"}
+
+    with patch('time.sleep') as mock_sleep:
+        retry.sleep(response)
+
+    mock_sleep.assert_called_once_with(7)
+
+def test_session_cache_expiry(api):
+    """Test that static endpoints are cached longer than study data."""
+    from requests_cache import get_expiration_datetime
+
+    settings = api.session.settings
+    enums_expiry = settings.urls_expire_after[f"{api.BASE_URL.split('://', 1)[-1]}/studies/enums"]
+
+    assert settings.cache_control
+    assert get_expiration_datetime(enums_expiry) > get_expiration_datetime(settings.expire_after)
+
+def test_list_studies_paginated_iter_is_lazy(api):
+    """Test that the iterator yields a page's studies before its later pages are consumed."""
+    with patch.object(api, '_make_request') as mock_request:
+        page1 = {"studies": [{"id": 1}, {"id": 2}], "nextPageToken": "token1"}
+        page2 = {"studies": [{"id": 3}]}
+        mock_request.side_effect = [page1, page2]
+
+        studies = api.list_studies_paginated_iter(max_pages=None)
+
+        assert next(studies) == {"id": 1}
+        assert list(studies) == [{"id": 2}, {"id": 3}]
+        assert mock_request.call_count == 2
+
+def test_print_dict_recursively(api, capsys):
+    """Test that dictionaries are printed as sorted, indented JSON."""
+    api.print_dict_recursively({"b": [1, {"c": None}], "a": "x"})
+
+    assert capsys.readouterr().out == '{\n  "a": "x",\n  "b": [\n    1,\n    {\n      "c": null\n    }\n  ]\n}\n'
+
+def test_list_endpoints_and_parameters_are_shared(api):
+    """Test that endpoint and parameter listings are read-only module constants."""
+    endpoints = api.list_endpoints()
+
+    assert endpoints is ClinicalTrialsAPI().list_endpoints()
+    assert endpoints["fetch_study"] == f"{config.API_BASE_URL}/studies/{{nctId}}"
+    with pytest.raises(TypeError):
+        endpoints["new"] = "value"
+    assert api.list_parameters()["fetch_study"][0] == {"name": "nctId", "required": True}
+
+def test_list_studies_paginated_skips_duplicates(api):
+    """Test that a study returned on more than one page is only yielded once."""
+    def study(nct_id):
+        return {"protocolSection": {"identificationModule": {"nctId": nct_id}}}
+
+    with patch.object(api, '_make_request') as mock_request:
+        page1 = {"studies": [study("NCT1"), study("NCT2")], "nextPageToken": "token1"}
+        page2 = {"studies": [study("NCT2"), study("NCT3")]}
+        mock_request.side_effect = [page1, page2]
+
+        studies = api.list_studies_paginated(max_pages=None)
+
+        assert studies == [study("NCT1"), study("NCT2"), study("NCT3")]
+
+def test_fetch_studies_batch(api):
+    """Test that NCT IDs are fetched CHUNK_SIZE at a time via filter.ids."""
+    nct_ids = [f"NCT{i:08d}" for i in range(config.CHUNK_SIZE + 1)]
+
+    with patch.object(api, 'list_studies') as mock_list:
+        mock_list.side_effect = lambda params: {"studies": [{"id": i} for i in params["filter.ids"].split(",")]}
+
+        studies = api.fetch_studies_batch(nct_ids, params={"fields": "NCTId"})
+
+        assert [s["id"] for s in studies] == nct_ids
+        assert mock_list.call_count == 2
+        last_params = mock_list.call_args_list[1][0][0]
+        assert last_params == {"fields": "NCTId", "filter.ids": nct_ids[-1], "pageSize": 1}
+
+def test_httpx_backend_retries_and_decodes():
+    """Test that the HTTP/2 backend retries failures and shares the endpoint methods."""
+    import httpx
+    from biomed_tools.clinical_trials import HttpxClinicalTrialsAPI
+
+    responses = iter([httpx.Response(503), httpx.Response(200, json={"studies": [{"id": 1}]})])
+
+    with HttpxClinicalTrialsAPI() as api, patch('time.sleep'):
+        api.client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+        assert api.list_studies({"query.cond": "test"}) == {"studies": [{"id": 1}]}
+
+def test_httpx_backend_does_not_retry_client_errors():
+    import httpx
+    from biomed_tools.clinical_trials import HttpxClinicalTrialsAPI
+
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(404)
+
+    with HttpxClinicalTrialsAPI() as api, patch('time.sleep') as mock_sleep:
+        api.client = httpx.Client(transport=httpx.MockTransport(handler))
+        assert api.fetch_study("NCT404") is None
+
+    assert len(requests_seen) == 1
+    mock_sleep.assert_not_called()
+
+def test_make_request_leaves_params_unchanged(api):
+    """Test that _make_request doesn't mutate params, which pagination relies on."""
+    params = {"query.cond": "test", "pageSize": 10}
+    with patch.object(api.session, 'get') as mock_get:
+        mock_get.return_value.content = orjson.dumps({"studies": []})
+
+        api._make_request("studies", params)
+
+    assert params == {"query.cond": "test", "pageSize": 10}
+
+def test_list_studies_paginated_leaves_caller_params_unchanged(api):
+    """Test that page tokens aren't written into the caller's params."""
+    params = {"query.cond": "test"}
+    with patch.object(api, '_make_request') as mock_request:
+        mock_request.side_effect = [{"studies": [], "nextPageToken": "token1"}, {"studies": []}]
+
+        api.list_studies_paginated(params, max_pages=None)
+
+    assert params == {"query.cond": "test"}
+
+def test_warmup_runs_in_background():
+    """Test that warmup=True opens a connection without blocking construction."""
+    with patch.object(ClinicalTrialsAPI, 'warmup') as mock_warmup, \
+         patch('threading.Thread') as mock_thread:
+        ClinicalTrialsAPI(warmup=True)
+
+    mock_thread.assert_called_once_with(target=mock_warmup, daemon=True)
+    mock_thread.return_value.start.assert_called_once()
+
+def test_warmup_ignores_failures(api):
+    """Test that a failed warmup doesn't raise."""
+    with patch.object(api.session, 'head', side_effect=requests.exceptions.ConnectionError("offline")):
+        api.warmup()
+
+def test_cache_serializer_round_trip():
+    """Test that cached responses are compressed and old uncompressed entries read as misses."""
+    from requests_cache import CachedResponse
+    from biomed_tools.clinical_trials.api import cache_serializer
+
+    serializer = cache_serializer()
+    response = CachedResponse(status_code=200, content=orjson.dumps({"studies": [{"nctId": "NCT1"}] * 100}))
+
+    data = serializer.dumps(response)
+
+    assert len(data) < len(response.content)
+    assert serializer.loads(data).content == response.content
+    with pytest.raises(ValueError):
+        serializer.loads(b"not compressed")
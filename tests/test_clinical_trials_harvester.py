@@ -112,3 +112,330 @@ def test_run_clinical_trials_query_integration():
         # Verify Search Term
         term = session.query(models.SearchTerm).filter_by(term="integration test").first()
         assert term is not None
+
+def test_run_clinical_trials_query_streams_batches():
+    """Trials are committed batch by batch and pages past max_records aren't fetched."""
+    with patch('biomed_tools.clinical_trials.harvester.ClinicalTrialsAPI') as MockAPI, \
+         patch('biomed_tools.clinical_trials.harvester.get_session') as mock_get_session, \
+         patch('biomed_tools.clinical_trials.harvester.create_tables'), \
+         patch.object(config, 'BATCH_SIZE', 2), \
+         patch.object(config, 'CHUNK_SIZE', 2):
+
+        engine = create_engine("sqlite:///:memory:")
+        models.Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        mock_get_session.return_value = session
+
+        def page(ids, token):
+            studies = [{"protocolSection": {"identificationModule": {"nctId": i}}} for i in ids]
+            return {"studies": studies, "totalCount": 6, "nextPageToken": token}
+
+        api_instance = MockAPI.return_value
+        api_instance.list_studies.side_effect = [
+            page(["NCT1", "NCT2"], "t1"),
+            page(["NCT3", "NCT4"], "t2"),
+            page(["NCT5", "NCT6"], None),
+        ]
+
+        count = harvester.run_clinical_trials_query("streaming test", max_records=3)
+
+        assert count == 3
+        assert api_instance.list_studies.call_count == 2
+        assert session.query(models.ClinicalTrial).count() == 3
+        assert session.query(models.SearchToTrial).count() == 3
+
+def _run_with_pages(side_effect, **kwargs):
+    """Runs the harvester against an in-memory DB, spying on session and API cleanup."""
+    with patch('biomed_tools.clinical_trials.harvester.ClinicalTrialsAPI') as MockAPI, \
+         patch('biomed_tools.clinical_trials.harvester.get_session') as mock_get_session, \
+         patch('biomed_tools.clinical_trials.harvester.create_tables'), \
+         patch.object(config, 'BATCH_SIZE', 2), \
+         patch.object(config, 'CHUNK_SIZE', 2):
+
+        engine = create_engine("sqlite:///:memory:")
+        models.Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        mock_get_session.return_value = session
+        api_instance = MockAPI.return_value
+        api_instance.list_studies.side_effect = side_effect
+
+        with patch.object(session, 'close', wraps=session.close) as close:
+            count = harvester.run_clinical_trials_query("cleanup test", **kwargs)
+        return count, session, close, api_instance
+
+def _page(ids, token):
+    studies = [{"protocolSection": {"identificationModule": {"nctId": i}}} for i in ids]
+    return {"studies": studies, "totalCount": 4, "nextPageToken": token}
+
+def test_run_clinical_trials_query_closes_session_on_success():
+    count, _, close, api_instance = _run_with_pages([_page(["NCT1", "NCT2"], None)])
+
+    assert count == 2
+    close.assert_called_once()
+    api_instance.close.assert_called_once()
+
+def test_run_clinical_trials_query_returns_partial_count_on_error():
+    """A failure after a committed batch reports what was stored and still closes the session."""
+    count, session, close, api_instance = _run_with_pages(
+        [_page(["NCT1", "NCT2"], "t1"), RuntimeError("boom")]
+    )
+
+    assert count == 2
+    assert session.query(models.ClinicalTrial).count() == 2
+    close.assert_called_once()
+    api_instance.close.assert_called_once()
+
+def test_store_studies_upserts_trials_and_children(db_session):
+    """Trials are upserted and child rows inserted in bulk."""
+    study = {
+        "protocolSection": {
+            "identificationModule": {"nctId": "NCT777", "briefTitle": "Old title"},
+            "outcomesModule": {"primaryOutcomes": [{"measure": "Survival"}]},
+            "eligibilityModule": {"sex": "ALL"},
+        }
+    }
+    updated = {"protocolSection": {"identificationModule": {"nctId": "NCT777", "briefTitle": "New title"}}}
+
+    search_term = models.SearchTerm(term="upsert")
+    db_session.add(search_term)
+    db_session.commit()
+
+    harvester.store_studies(db_session, [study], search_term.id)
+    harvester.store_studies(db_session, [updated], search_term.id)
+    db_session.commit()
+
+    trial = db_session.query(models.ClinicalTrial).filter_by(nct_id="NCT777").one()
+    assert trial.brief_title == "New title"
+    assert db_session.query(models.Outcome).filter_by(trial_nct_id="NCT777", measure="Survival").count() == 1
+    assert db_session.query(models.Eligibility).filter_by(trial_nct_id="NCT777", sex="ALL").count() == 1
+    assert db_session.query(models.SearchToTrial).count() == 1
+
+def test_store_studies_reuses_intervention_without_type(db_session):
+    """An intervention with no type resolves to the same row when harvested again."""
+    study = {
+        "protocolSection": {
+            "identificationModule": {"nctId": "NCT888"},
+            "armsInterventionsModule": {
+                "interventions": [{"name": "Placebo"}],
+                "armGroups": [{"label": "Control", "interventionNames": ["Placebo"]}],
+            },
+        }
+    }
+
+    search_term = models.SearchTerm(term="untyped")
+    db_session.add(search_term)
+    db_session.commit()
+
+    for _ in range(2):
+        harvester.store_studies(db_session, [study], search_term.id)
+        db_session.commit()
+
+    intervention = db_session.query(models.Intervention).one()
+    assert (intervention.name, intervention.type) == ("Placebo", "")
+    assert {link.intervention_id for link in db_session.query(models.ArmIntervention)} == {intervention.id}
+
+def test_store_studies_shares_entities(db_session):
+    """Entities shared across trials are stored once and linked to each trial."""
+    def study(nct_id):
+        return {
+            "protocolSection": {
+                "identificationModule": {"nctId": nct_id, "organization": {"fullName": "Org", "class": "OTHER"}},
+                "conditionsModule": {"conditions": ["Asthma"], "keywords": ["lung"]},
+                "armsInterventionsModule": {
+                    "armGroups": [{"label": "A", "interventionNames": ["Drug: Aspirin"]}],
+                    "interventions": [{"name": "Aspirin", "type": "DRUG"}],
+                },
+            }
+        }
+
+    db_session.add(models.Condition(name="Asthma"))
+    search_term = models.SearchTerm(term="shared")
+    db_session.add(search_term)
+    db_session.commit()
+
+    harvester.store_studies(db_session, [study("NCT1"), study("NCT2")], search_term.id)
+    db_session.commit()
+
+    assert db_session.query(models.Condition).count() == 1
+    assert db_session.query(models.Organization).count() == 1
+    assert db_session.query(models.Intervention).count() == 1
+    assert db_session.query(models.TrialCondition).count() == 2
+    assert db_session.query(models.TrialKeyword).count() == 2
+    assert db_session.query(models.ArmIntervention).count() == 2
+    arm = db_session.query(models.Arm).filter_by(trial_nct_id="NCT2").one()
+    assert [link.intervention.name for link in arm.interventions] == ["Aspirin"]
+
+def test_fetch_all_trials_saves_ndjson(tmp_path):
+    """Studies are saved one JSON object per line."""
+    import orjson
+
+    with patch('biomed_tools.clinical_trials.harvester.ClinicalTrialsAPI') as MockAPI:
+        studies = [{"protocolSection": {"identificationModule": {"nctId": f"NCT00{i}"}}} for i in range(3)]
+        MockAPI.return_value.list_studies.return_value = {"studies": studies, "totalCount": 3}
+        save_path = tmp_path / "trials.ndjson"
+
+        harvester.fetch_all_trials("test query", save_path=str(save_path))
+
+    assert [orjson.loads(line) for line in save_path.read_bytes().splitlines()] == studies
+
+def test_find_existing_nct_ids(db_session):
+    """Stored NCT IDs are found however many IDs are probed."""
+    db_session.add(models.ClinicalTrial(nct_id="NCT00000001"))
+    db_session.add(models.ClinicalTrial(nct_id="NCT00000002"))
+    db_session.commit()
+
+    probe = [f"NCT{i:08d}" for i in range(2000)]
+
+    assert harvester.find_existing_nct_ids(db_session, probe) == {"NCT00000001", "NCT00000002"}
+    assert harvester.find_existing_nct_ids(db_session, ["NCT00000002", "NCT99999999"]) == {"NCT00000002"}
+
+def test_store_trials_dedupes_studies(db_session):
+    """A study repeated in a batch is stored once, from its last copy."""
+    def study(title):
+        return {
+            "protocolSection": {
+                "identificationModule": {"nctId": "NCT555", "briefTitle": title},
+                "conditionsModule": {"conditions": ["Flu", "Flu"]},
+                "eligibilityModule": {"sex": "ALL"},
+            }
+        }
+
+    search_term = models.SearchTerm(term="dedupe")
+    db_session.add(search_term)
+    db_session.commit()
+
+    count = harvester.store_trials(db_session, [study("First"), study("Second")], search_term.id)
+    db_session.commit()
+
+    assert count == 1
+    assert db_session.query(models.ClinicalTrial).one().brief_title == "Second"
+    assert db_session.query(models.TrialCondition).count() == 1
+
+def test_create_tables_adds_indexes_to_existing_db(tmp_path):
+    """Indexes added since a database was created are built on the next create_tables."""
+    from sqlalchemy import inspect
+
+    db_url = f"sqlite:///{tmp_path / 'trials.db'}"
+    engine = create_engine(db_url)
+    models.Intervention.__table__.create(engine)
+    engine.dispose()
+
+    with patch.object(config, 'DB_URL', db_url):
+        models.create_tables()
+        index_names = {index["name"] for index in inspect(models.get_engine()).get_indexes("interventions")}
+
+    assert "uq_intervention_name_type" in index_names
+
+def test_study_to_rows_maps_nested_fields():
+    """Nested study fields map onto row columns, with missing sections left as None."""
+    from datetime import datetime
+
+    study = {
+        "protocolSection": {
+            "identificationModule": {"nctId": "NCT321", "briefTitle": "Title"},
+            "statusModule": {"startDateStruct": {"date": "2020-01-31"}, "completionDateStruct": {"date": "2020-02"}},
+            "designModule": {"enrollmentInfo": {"count": 40}},
+            "contactsLocationsModule": {"locations": [{"city": "Oslo", "geoPoint": {"lat": 59.9, "lon": 10.7}}, {"city": "Bergen"}]},
+        },
+        "hasResults": True,
+    }
+
+    rows = harvester.study_to_rows(study)
+
+    trial = rows[models.ClinicalTrial][0]
+    assert trial["nct_id"] == "NCT321"
+    assert trial["start_date"] == datetime(2020, 1, 31)
+    assert trial["completion_date"] is None
+    assert trial["enrollment_count"] == 40
+    assert trial["detailed_description"] is None
+    assert trial["has_results"] is True
+    assert [(r["city"], r["latitude"]) for r in rows[models.Location]] == [("Oslo", 59.9), ("Bergen", None)]
+    assert rows[models.Location][0]["trial_nct_id"] == "NCT321"
+    assert rows[models.Outcome] == [] and rows[models.Eligibility] == []
+
+def test_link_trials_to_search_ignores_existing_links(db_session):
+    """Linking the same trials twice leaves one link per trial."""
+    search_term = models.SearchTerm(term="links")
+    db_session.add(search_term)
+    db_session.commit()
+
+    harvester.link_trials_to_search(db_session, search_term.id, ["NCT1", "NCT2"])
+    harvester.link_trials_to_search(db_session, search_term.id, ["NCT2", "NCT3"])
+    harvester.link_trials_to_search(db_session, search_term.id, [])
+
+    assert db_session.query(models.SearchToTrial).count() == 3
+
+def test_export_trials_streams_pages(tmp_path):
+    """Each page's studies are written as NDJSON and counted."""
+    import orjson
+
+    api = MagicMock()
+    page1 = {"studies": [{"nctId": "NCT1"}, {"nctId": "NCT2"}], "totalCount": 3, "nextPageToken": "t1"}
+    page2 = {"studies": [{"nctId": "NCT3"}]}
+    api.list_studies.side_effect = [page1, page2]
+    save_path = tmp_path / "export.ndjson"
+
+    written = harvester.export_trials("test query", str(save_path), api=api)
+
+    assert written == 3
+    assert [orjson.loads(line)["nctId"] for line in save_path.read_bytes().splitlines()] == ["NCT1", "NCT2", "NCT3"]
+
+def test_store_trials_maps_studies_in_worker_processes(db_session):
+    """Studies mapped in worker processes are stored the same as in-process."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    studies = [
+        {"protocolSection": {"identificationModule": {"nctId": f"NCT{i}"}, "eligibilityModule": {"sex": "ALL"}}}
+        for i in range(3)
+    ]
+    search_term = models.SearchTerm(term="workers")
+    db_session.add(search_term)
+    db_session.commit()
+
+    with ProcessPoolExecutor(2) as executor:
+        count = harvester.store_trials(db_session, studies, search_term.id, executor)
+    db_session.commit()
+
+    assert count == 3
+    assert db_session.query(models.Eligibility).count() == 3
+
+def test_get_or_create_search_term(db_session):
+    """The same term maps to the same id, whether it is new or already stored."""
+    first = harvester.get_or_create_search_term(db_session, "asthma")
+    second = harvester.get_or_create_search_term(db_session, "asthma")
+    other = harvester.get_or_create_search_term(db_session, "copd")
+
+    assert first == second != other
+    assert db_session.query(models.SearchTerm).count() == 2
+
+def test_store_studies_tolerates_null_sections(db_session):
+    """Sections the API returns as null are treated as empty."""
+    study = {
+        "protocolSection": {
+            "identificationModule": {"nctId": "NCT888"},
+            "statusModule": None,
+            "conditionsModule": {"conditions": None},
+            "contactsLocationsModule": {"locations": [{"city": "Lima", "geoPoint": None}]},
+            "sponsorCollaboratorsModule": None,
+        },
+        "resultsSection": {"adverseEventsModule": None},
+    }
+    search_term = models.SearchTerm(term="nulls")
+    db_session.add(search_term)
+    db_session.commit()
+
+    harvester.store_studies(db_session, [study], search_term.id)
+    db_session.commit()
+
+    assert db_session.query(models.ClinicalTrial).one().start_date is None
+    assert db_session.query(models.Location).one().latitude is None
+
+def test_insert_rows_writes_child_rows(db_session):
+    """Child rows inserted through the DB-API cursor land in the session's transaction."""
+    harvester.insert_rows(db_session, models.Reference, [
+        {"trial_nct_id": "NCT1", "pmid": "123", "type": "RESULT", "citation": "A"},
+        {"trial_nct_id": "NCT1", "pmid": None, "type": None, "citation": "B"},
+    ])
+    db_session.commit()
+
+    assert [r.citation for r in db_session.query(models.Reference).order_by(models.Reference.id)] == ["A", "B"]
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from biomed_tools.daily_med import DailyMedApi
+from biomed_tools.daily_med import DailyMedApi, config
 import requests
 
 @pytest.fixture
@@ -11,7 +11,7 @@ def test_search_drug_name(api):
     with patch.object(api.session, 'get') as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"data": []}
+        mock_response.content = b'{"data": []}'
         mock_get.return_value = mock_response
 
         result = api.search_drug_name("ASPIRIN")
@@ -20,6 +20,7 @@ def test_search_drug_name(api):
         mock_get.assert_called_once()
         assert "drugnames.json" in mock_get.call_args[0][0]
         assert mock_get.call_args[1]['params'] == {"drug_name": "ASPIRIN"}
+        assert mock_get.call_args[1]['timeout'] == config.REQUEST_TIMEOUT
 
 def test_get_drug_spls(api):
     with patch.object(api.session, 'get') as mock_get:
@@ -32,3 +33,24 @@ def test_get_drug_spls(api):
         
         assert result == b"<xml>data</xml>"
         mock_get.assert_called_once()
+
+def test_session_pooling_and_retries(api):
+    """Test that the session pools connections, retries transient failures and asks for compression."""
+    from biomed_tools.daily_med import config
+
+    adapter = api.session.get_adapter(api.base_url)
+
+    assert adapter._pool_maxsize == config.POOL_MAXSIZE
+    assert adapter.max_retries.total == config.MAX_RETRIES
+    assert 503 in adapter.max_retries.status_forcelist
+    assert "gzip" in api.session.headers["Accept-Encoding"]
+
+def test_session_cache(api):
+    """Test that responses are cached, and that caching can be turned off."""
+    import requests_cache
+    from biomed_tools.daily_med import config
+
+    assert isinstance(api.session, requests_cache.CachedSession)
+    assert api.session.settings.cache_control
+    with patch.object(config, 'CACHE_ENABLED', False):
+        assert not isinstance(DailyMedApi().session, requests_cache.CachedSession)
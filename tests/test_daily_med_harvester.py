@@ -7,9 +7,15 @@ from biomed_tools.daily_med.models import Drug, SearchTerm
 @patch("biomed_tools.daily_med.harvester.get_session")
 @patch("biomed_tools.daily_med.harvester.create_tables")
 def test_run_daily_med_query(mock_create_tables, mock_get_session, mock_api_cls):
-    # Setup mocks
-    mock_session = MagicMock()
-    mock_get_session.return_value = mock_session
+    # Setup an in-memory database
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from biomed_tools.daily_med.models import Base
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    mock_get_session.return_value = session
     
     mock_api = MagicMock()
     mock_api_cls.return_value = mock_api
@@ -25,9 +31,6 @@ def test_run_daily_med_query(mock_create_tables, mock_get_session, mock_api_cls)
         },
         {"data": []} # Subsequent calls (though loop should stop based on page logic)
     ]
-    
-    # Mock database queries
-    mock_session.query.return_value.filter_by.return_value.first.return_value = None  # No existing search term
 
     # Run the function
     count = run_daily_med_query("test drug")
@@ -36,19 +39,29 @@ def test_run_daily_med_query(mock_create_tables, mock_get_session, mock_api_cls)
     assert count == 2
     mock_create_tables.assert_called_once()
     mock_api.search_spls.assert_called()
-    
-    # Verify drugs were added to session
-    # We expect 2 merges for drugs + 1 add for search term + 1 commit
-    assert mock_session.merge.call_count == 2
-    assert mock_session.add.call_count == 1  # Search term
-    assert mock_session.commit.call_count >= 1
-
-    # Verify call arguments for merge (Drugs)
-    calls = mock_session.merge.call_args_list
-    assert calls[0][0][0].set_id == "set1"
-    assert calls[0][0][0].drug_name == "Test Drug 1"
-    assert calls[1][0][0].set_id == "set2"
-    assert calls[1][0][0].drug_name == "Test Drug 2"
+
+    # Verify drugs and the search term were stored
+    session = sessionmaker(bind=engine)()
+    drugs = session.query(Drug).order_by(Drug.set_id).all()
+    assert [(d.set_id, d.drug_name, d.spl_version) for d in drugs] == [("set1", "Test Drug 1", 1), ("set2", "Test Drug 2", 2)]
+    assert session.query(SearchTerm).filter_by(term="test drug").count() == 1
+
+def test_store_drugs_upserts():
+    """Re-storing a Set ID updates it, and the last copy in a batch wins."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from biomed_tools.daily_med.harvester import store_drugs
+    from biomed_tools.daily_med.models import Base
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    store_drugs(session, [{"setid": "set1", "title": "Old"}, {"title": "No Set ID"}])
+    store_drugs(session, [{"setid": "set1", "title": "Newer"}, {"setid": "set1", "title": "Newest"}])
+    session.commit()
+
+    assert [(d.set_id, d.drug_name) for d in session.query(Drug)] == [("set1", "Newest")]
 
 @patch("biomed_tools.daily_med.harvester.DailyMedApi")
 @patch("biomed_tools.daily_med.harvester.get_session")
@@ -60,9 +73,36 @@ def test_run_daily_med_query_no_results(mock_create_tables, mock_get_session, mo
     mock_api_cls.return_value = mock_api
     
     mock_api.search_spls.return_value = {"data": [], "metadata": {"total_pages": 0}}
-    mock_session.query.return_value.filter_by.return_value.first.return_value = None
+    mock_session.execute.return_value.scalar_one.return_value = 1
 
     count = run_daily_med_query("unknown drug")
 
     assert count == 0
-    mock_session.merge.assert_not_called()
+    # Only the search term upsert; nothing is stored
+    mock_session.execute.assert_called_once()
+
+def test_fetch_all_spls_fetches_remaining_pages_in_order():
+    """Pages after the first are fetched concurrently but returned in page order."""
+    from biomed_tools.daily_med.harvester import fetch_all_spls
+
+    api = MagicMock()
+
+    def search_spls(query, page, page_size):
+        return {"data": [{"setid": f"set{page}"}], "metadata": {"total_pages": 4}}
+
+    api.search_spls.side_effect = search_spls
+
+    spls = fetch_all_spls(api, "aspirin")
+
+    assert [spl["setid"] for spl in spls] == ["set1", "set2", "set3", "set4"]
+    assert api.search_spls.call_count == 4
+
+def test_engine_uses_wal(tmp_path):
+    """File-backed engines switch SQLite to WAL with relaxed syncing."""
+    from sqlalchemy import text
+    from biomed_tools.daily_med import models
+
+    with patch("biomed_tools.daily_med.config.DB_URL", f"sqlite:///{tmp_path}/daily_med.db"):
+        with models.get_engine().connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
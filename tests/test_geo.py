@@ -17,29 +17,65 @@ def test_download_geometadb_exists(mock_db_path):
         harvester.download_geometadb()
         mock_req.get.assert_not_called()
 
-def test_download_geometadb_download():
-    # Use mocks for paths to avoid filesystem issues with mocked open
-    mock_db_path_obj = MagicMock()
-    mock_db_path_obj.exists.return_value = False
-    mock_gz_path = MagicMock()
-    mock_db_path_obj.with_suffix.return_value = mock_gz_path
-    
-    with patch("biomed_tools.geo.config.get_db_path", return_value=mock_db_path_obj), \
-         patch("biomed_tools.geo.harvester.requests.get") as mock_get, \
-         patch("biomed_tools.geo.harvester.gzip.open") as mock_gzip, \
-         patch("biomed_tools.geo.harvester.shutil.copyfileobj") as mock_copy, \
-         patch("builtins.open", mock_open()) as mock_file:
-        
+def test_download_geometadb_download(mock_db_path):
+    import gzip
+    import io
+
+    content = b"SQLite format 3\x00" + b"x" * 1000
+    with patch("biomed_tools.geo.harvester.requests.get") as mock_get:
         mock_response = MagicMock()
-        mock_response.iter_content.return_value = [b"chunk1"]
+        mock_response.raw = io.BytesIO(gzip.compress(content))
         mock_response.raise_for_status.return_value = None
         mock_get.return_value.__enter__.return_value = mock_response
 
         harvester.download_geometadb()
-        
-        mock_get.assert_called_once()
-        assert mock_copy.called
-        mock_gz_path.unlink.assert_called()
+
+    mock_get.assert_called_once()
+    assert mock_db_path.read_bytes() == content
+    assert list(mock_db_path.parent.iterdir()) == [mock_db_path]
+
+def test_download_geometadb_failure_removes_partial_file(mock_db_path):
+    import io
+
+    with patch("biomed_tools.geo.harvester.requests.get") as mock_get:
+        mock_get.return_value.__enter__.return_value.raw = io.BytesIO(b"not gzip")
+
+        with pytest.raises(Exception):
+            harvester.download_geometadb()
+
+    assert not mock_db_path.exists()
+
+def test_gunzip_stream_handles_members_and_truncation():
+    import gzip
+    import io
+
+    out = io.BytesIO()
+    harvester.gunzip_stream(io.BytesIO(gzip.compress(b"abc" * 1000) + gzip.compress(b"def")), out, chunk_size=7)
+    assert out.getvalue() == b"abc" * 1000 + b"def"
+
+    with pytest.raises(EOFError):
+        harvester.gunzip_stream(io.BytesIO(gzip.compress(b"abc" * 1000)[:-10]), io.BytesIO())
+
+def test_gunzip_stream_stops_reading_after_corrupt_member():
+    import gzip
+    import io
+    import zlib
+
+    member = bytearray(gzip.compress(b"abc" * 1000))
+    member[-8] ^= 0xFF  # Corrupt the CRC32 trailer
+    raw = io.BytesIO(bytes(member) + gzip.compress(b"def" * 1000) * 10000)
+    reads = 0
+    read = raw.read
+
+    def counting_read(size):
+        nonlocal reads
+        reads += 1
+        return read(size)
+
+    raw.read = counting_read
+    with pytest.raises(zlib.error):
+        harvester.gunzip_stream(raw, io.BytesIO(), chunk_size=64)
+    assert reads < 100  # The stream is over 6000 chunks long
 
 def test_find_gse_by_keyword_no_db(mock_db_path):
     if mock_db_path.exists():
@@ -64,3 +100,52 @@ def test_find_gse_by_keyword_with_db(mock_db_path):
     
     df = utils.find_gse_by_keyword("Cancer")
     assert len(df) == 2
+
+def test_find_gse_by_keyword_uses_fts_index(mock_db_path):
+    con = sqlite3.connect(mock_db_path)
+    con.execute("CREATE TABLE gse (gse TEXT, title TEXT, summary TEXT)")
+    con.execute("INSERT INTO gse VALUES ('GSE1', 'Lung Cancer Study', 'Summary of lung cancer')")
+    con.execute("INSERT INTO gse VALUES ('GSE2', 'Breast Cancer', 'Summary')")
+    con.execute("INSERT INTO gse VALUES ('GSE3', 'Other', 'Nothing \"quoted\"')")
+    con.commit()
+    con.close()
+
+    utils.build_gse_fts(mock_db_path)
+    utils.build_gse_fts(mock_db_path)  # No-op once the index exists
+
+    with patch("biomed_tools.geo.utils.pd.read_sql_query", wraps=pd.read_sql_query) as mock_read:
+        df = utils.find_gse_by_keyword("lung")
+        assert "MATCH" in mock_read.call_args.args[0]
+    assert df['gse'].tolist() == ['GSE1']
+
+    assert sorted(utils.find_gse_by_keyword("ancer")['gse']) == ['GSE1', 'GSE2']
+    assert utils.find_gse_by_keyword('"quoted"')['gse'].tolist() == ['GSE3']
+    # Too short for trigrams, so it falls back to LIKE
+    assert utils.find_gse_by_keyword("Ot")['gse'].tolist() == ['GSE3']
+
+def test_iter_gse_by_keyword_yields_chunks(mock_db_path):
+    con = sqlite3.connect(mock_db_path)
+    con.execute("CREATE TABLE gse (gse TEXT, title TEXT, summary TEXT)")
+    con.executemany("INSERT INTO gse VALUES (?, ?, ?)", [(f"GSE{i}", "Cancer", "Summary") for i in range(5)])
+    con.commit()
+    con.close()
+
+    chunks = list(utils.iter_gse_by_keyword("cancer", chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert len(utils.find_gse_by_keyword("cancer")) == 5
+    assert utils.find_gse_by_keyword("melanoma").empty
+
+def test_download_geometadb_rejects_crc_mismatch(mock_db_path):
+    import gzip
+    import io
+    import zlib
+
+    data = bytearray(gzip.compress(b"SQLite format 3\x00" + b"x" * 1000))
+    data[-6] ^= 0xFF  # Corrupt the CRC32 in the gzip trailer
+    with patch("biomed_tools.geo.harvester.requests.get") as mock_get:
+        mock_get.return_value.__enter__.return_value.raw = io.BytesIO(bytes(data))
+
+        with pytest.raises(zlib.error, match="incorrect data check"):
+            harvester.download_geometadb()
+
+    assert not mock_db_path.exists()
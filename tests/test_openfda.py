@@ -9,12 +9,19 @@ def test_api_search_events():
     with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"results": [{"safetyreportid": "123"}]}
+        mock_response.content = b'{"results": [{"safetyreportid": "123"}]}'
         mock_get.return_value = mock_response
         
         result = api.search_events("aspirin", limit=1)
         assert result["results"][0]["safetyreportid"] == "123"
 
+def test_api_requests_compressed_responses():
+    from biomed_tools.openfda import config
+
+    api = OpenFDAAPI()
+    assert "gzip" in api.session.headers["Accept-Encoding"]
+    assert api.session.headers["User-Agent"] == config.HTTP_HEADERS["User-Agent"]
+
 def test_harvester_events(tmp_path):
     # Mock DB URL to use tmp file
     db_url = f"sqlite:///{tmp_path}/test_openfda.db"
@@ -64,3 +71,248 @@ def test_harvester_labels(tmp_path):
             label = session.query(DrugLabel).first()
             assert label.id == "LABEL001"
             session.close()
+
+def test_fetch_records_fetches_pages_concurrently_in_order():
+    """Pages after the first are fetched up to the reported total and returned in offset order."""
+    from biomed_tools.openfda import config
+    from biomed_tools.openfda.harvester import fetch_records
+
+    def search(query, limit, skip):
+        return {"meta": {"results": {"total": 5}}, "results": [{"skip": skip}] * min(limit, 5 - skip)}
+
+    api_method = MagicMock(side_effect=search)
+    with patch.object(config, "CHUNK_SIZE", 2):
+        records = fetch_records(api_method, "aspirin", max_records=100)
+
+    assert [r["skip"] for r in records] == [0, 0, 2, 2, 4]
+    assert api_method.call_count == 3
+
+def test_store_records_replaces_event_children():
+    """Re-storing an event upserts it and replaces its drugs and reactions."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from biomed_tools.openfda.harvester import store_records
+    from biomed_tools.openfda.models import Base, DrugEventDrug, DrugEventReaction, SearchToEvent
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    def event(serious, drugs):
+        return {
+            "safetyreportid": "EV1",
+            "serious": serious,
+            "patient": {"drug": [{"medicinalproduct": d, "openfda": {"brand_name": [d, "X"]}} for d in drugs],
+                        "reaction": [{"reactionmeddrapt": "Nausea"}]},
+        }
+
+    store_records(session, "event", [event(1, ["ASPIRIN", "IBUPROFEN"])], search_id=1)
+    store_records(session, "event", [event(2, ["ASPIRIN"]), {"serious": 1}], search_id=1)
+    session.commit()
+
+    assert session.query(DrugEvent).one().serious == "2"
+    assert [(d.medicinalproduct, d.brand_name) for d in session.query(DrugEventDrug)] == [("ASPIRIN", "ASPIRIN|X")]
+    assert session.query(DrugEventReaction).count() == 1
+    assert session.query(SearchToEvent).count() == 1
+
+def test_get_session_reuses_engine_per_db_url(tmp_path):
+    """Sessions share one engine per DB_URL, and a new URL gets its own."""
+    from biomed_tools.openfda import models
+
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/a.db"):
+        first, second = models.get_session(), models.get_session()
+        assert first.get_bind() is second.get_bind() is models.get_engine()
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/b.db"):
+        assert models.get_session().get_bind() is not first.get_bind()
+
+def test_create_tables_indexes_event_children(tmp_path):
+    """Event child tables are indexed by report, including tables created before the index existed."""
+    import sqlite3
+    from sqlalchemy import inspect
+    from biomed_tools.openfda import models
+
+    db_path = tmp_path / "old.db"
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE drug_event_drugs (id INTEGER PRIMARY KEY, safetyreportid VARCHAR)")
+    con.close()
+
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{db_path}"):
+        models.create_tables()
+        inspector = inspect(models.get_engine())
+        for table in ("drug_event_drugs", "drug_event_reactions"):
+            assert [i["column_names"] for i in inspector.get_indexes(table)] == [["safetyreportid"]]
+
+def test_data_column_round_trips_through_orjson(tmp_path):
+    """Full records are serialized by orjson on write and decoded back to dicts on read."""
+    from sqlalchemy import text
+    from biomed_tools.openfda import models
+    from biomed_tools.openfda.harvester import store_records
+
+    record = {"recall_number": "R1", "products": ["é", {"n": 1}]}
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/json.db"):
+        models.create_tables()
+        session = models.get_session()
+        store_records(session, "enforcement", [record], search_id=1)
+        session.commit()
+
+        assert session.query(DrugEnforcement).one().data == record
+        raw = session.execute(text("SELECT data FROM drug_enforcement")).scalar()
+        assert raw == '{"recall_number":"R1","products":["é",{"n":1}]}'
+        session.close()
+
+def test_store_records_batches_child_inserts():
+    """A batch of events costs a fixed number of statements, with children inserted by executemany."""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from biomed_tools.openfda.harvester import store_records
+    from biomed_tools.openfda.models import Base
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, params, context, executemany: statements.append((statement.split()[0], executemany)))
+
+    events = [
+        {"safetyreportid": f"EV{i}", "patient": {"drug": [{"medicinalproduct": "A"}, {"medicinalproduct": "B"}],
+                                                 "reaction": [{"reactionmeddrapt": "Nausea"}]}}
+        for i in range(50)
+    ]
+    store_records(session, "event", events, search_id=1)
+    session.commit()
+
+    # One upsert, a delete and an executemany insert per child table, and one link insert
+    assert sorted(statements) == sorted([("INSERT", True), ("DELETE", False), ("INSERT", True),
+                                         ("DELETE", False), ("INSERT", True), ("INSERT", True)])
+    assert session.query(DrugEvent).count() == 50
+
+def test_iter_record_pages_bounds_read_ahead():
+    """Pages are fetched at most 2 * MAX_WORKERS ahead of the consumer."""
+    from biomed_tools.openfda import config
+    from biomed_tools.openfda.harvester import iter_record_pages
+
+    api_method = MagicMock(side_effect=lambda query, limit, skip: {"meta": {"results": {"total": 50}}, "results": [{"skip": skip}]})
+    with patch.object(config, "CHUNK_SIZE", 1), patch.object(config, "MAX_WORKERS", 1):
+        pages = iter_record_pages(api_method, "aspirin", max_records=50)
+        assert [next(pages), next(pages)] == [[{"skip": 0}], [{"skip": 1}]]
+        pages.close()
+
+    # The first page, two read ahead, and one refill
+    assert api_method.call_count <= 4
+
+def test_harvester_commits_each_page(tmp_path):
+    """Pages stored before a failure stay committed and are counted."""
+    from biomed_tools.openfda import config
+
+    def search(query, limit, skip):
+        if skip:
+            raise RuntimeError("boom")
+        return {"meta": {"results": {"total": 4}}, "results": [{"recall_number": "R1"}, {"recall_number": "R2"}]}
+
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/pages.db"), \
+         patch.object(config, "CHUNK_SIZE", 2), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_enforcement", side_effect=search):
+        assert run_openfda_query("aspirin", endpoint="enforcement", max_records=4) == 2
+
+        from biomed_tools.openfda.models import get_session
+        session = get_session()
+        assert sorted(r.recall_number for r in session.query(DrugEnforcement)) == ["R1", "R2"]
+        session.close()
+
+def test_event_child_delete_uses_index():
+    """The per-batch delete of event children is an index search, not a table scan."""
+    from sqlalchemy import create_engine, delete, text
+    from biomed_tools.openfda.models import Base, DrugEventDrug, DrugEventReaction
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        for model in (DrugEventDrug, DrugEventReaction):
+            table = model.__table__
+            stmt = delete(table).where(table.c.safetyreportid.in_(["EV1", "EV2"]))
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert f"USING INDEX ix_{table.name}_event" in plan
+
+def test_get_or_create_search_term_is_idempotent_per_endpoint():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from biomed_tools.openfda.harvester import get_or_create_search_term
+    from biomed_tools.openfda.models import Base, SearchTerm
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    first = get_or_create_search_term(session, "aspirin", "event")
+    assert get_or_create_search_term(session, "aspirin", "event") == first
+    assert get_or_create_search_term(session, "aspirin", "label") != first
+    assert session.query(SearchTerm).count() == 2
+
+def test_run_openfda_queries_harvests_endpoints_concurrently(tmp_path):
+    """Each endpoint is fetched on its own thread and stored by the calling thread."""
+    import threading
+    from biomed_tools.openfda.harvester import run_openfda_queries
+
+    both_started = threading.Barrier(2, timeout=5)
+
+    def label_search(query, limit, skip):
+        both_started.wait()  # Deadlocks unless the endpoints are fetched concurrently
+        return {"results": [{"id": "LABEL001", "set_id": "SET001"}]}
+
+    def ndc_search(query, limit, skip):
+        both_started.wait()
+        return {"results": [{"product_id": "P1"}, {"product_id": "P2"}]}
+
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/multi.db"), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_labels", side_effect=label_search), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_ndc", side_effect=ndc_search):
+        counts = run_openfda_queries("tylenol", endpoints=["label", "ndc", "bogus"], max_records=10)
+
+        assert counts == {"label": 1, "ndc": 2}
+        from biomed_tools.openfda.models import get_session
+        session = get_session()
+        assert session.query(DrugNDC).count() == 2
+        assert session.query(DrugLabel).one().id == "LABEL001"
+        session.close()
+
+def test_run_openfda_queries_shares_request_limit(tmp_path):
+    """Concurrent requests stay within MAX_WORKERS across all endpoints, not per endpoint."""
+    import threading
+    import time
+    from biomed_tools.openfda import config
+    from biomed_tools.openfda.harvester import run_openfda_queries
+
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def search(key):
+        def fetch(query, limit, skip):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+            return {"results": [{key: f"{key}{skip}", "set_id": f"SET{skip}"}], "meta": {"results": {"total": 6}}}
+        return fetch
+
+    with patch("biomed_tools.openfda.config.DB_URL", f"sqlite:///{tmp_path}/limit.db"), \
+         patch.object(config, "MAX_WORKERS", 2), \
+         patch.object(config, "CHUNK_SIZE", 1), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_labels", side_effect=search("id")), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_ndc", side_effect=search("product_id")), \
+         patch("biomed_tools.openfda.api.OpenFDAAPI.search_enforcement", side_effect=search("recall_number")):
+        counts = run_openfda_queries("tylenol", endpoints=["label", "ndc", "enforcement"], max_records=6)
+
+    assert counts == {"label": 6, "ndc": 6, "enforcement": 6}
+    assert peak <= 2
+
+def test_normalize_query():
+    from biomed_tools.openfda.utils import normalize_query
+
+    assert normalize_query("  Patient.Drug:ASPIRIN \t AND\nserious:1 ") == "patient.drug:aspirin and serious:1"
+    assert normalize_query("") == ""
+    assert normalize_query(None) == ""
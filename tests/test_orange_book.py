@@ -112,3 +112,131 @@ def test_harvest_flow():
 def test_is_data_stale():
     with patch('pathlib.Path.exists', return_value=False):
         assert utils.is_data_stale() is True
+
+def test_load_products_upserts(db_session):
+    """Reloading a product updates it, and a key repeated in one load keeps its last row."""
+    def df(*names):
+        return pd.DataFrame({
+            'Appl_No': ['123'] * len(names),
+            'Appl_Type': ['A'] * len(names),
+            'Product_No': ['001'] * len(names),
+            'Trade_Name': list(names),
+        })
+
+    harvester.load_products(db_session, df('Old'))
+    harvester.load_products(db_session, df('Newer', 'Newest'))
+    db_session.commit()
+
+    assert [p.trade_name for p in db_session.query(models.Product)] == ['Newest']
+
+def test_load_patents_in_batches(db_session):
+    """Rows are written one executemany per INSERT_BATCH_SIZE rows."""
+    df = pd.DataFrame({'Appl_No': ['123'] * 5, 'Appl_Type': ['A'] * 5, 'Product_No': ['001'] * 5,
+                       'Patent_No': [f'Pat{i}' for i in range(5)]})
+
+    with patch.object(config, 'INSERT_BATCH_SIZE', 2), \
+         patch.object(db_session, 'execute', wraps=db_session.execute) as mock_execute:
+        harvester.load_patents(db_session, df)
+    db_session.commit()
+
+    assert [len(call.args[1]) for call in mock_execute.call_args_list] == [2, 2, 1]
+    assert db_session.query(models.Patent).count() == 5
+
+def test_engine_pragmas(tmp_path):
+    """File-backed engines use WAL; synchronous is NORMAL unless OFF is opted into."""
+    from sqlalchemy import text
+
+    for setting, expected in (("NORMAL", 1), ("off", 0), ("bogus; DROP TABLE products", 1)):
+        with patch.object(config, "DB_URL", f"sqlite:///{tmp_path}/{expected}{len(setting)}.db"), \
+             patch.object(config, "SQLITE_SYNCHRONOUS", setting):
+            with models.get_engine().connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == expected
+
+def test_harvest_rolls_back_partial_load():
+    """A failure partway through the load leaves nothing committed."""
+    with patch('biomed_tools.orange_book.utils.is_data_stale', return_value=False), \
+         patch('pathlib.Path.exists', return_value=True), \
+         patch('pandas.read_csv') as mock_read_csv, \
+         patch('biomed_tools.orange_book.harvester.get_session') as mock_get_session, \
+         patch('biomed_tools.orange_book.harvester.drop_tables'), \
+         patch('biomed_tools.orange_book.harvester.create_tables'), \
+         patch('biomed_tools.orange_book.harvester.load_exclusivity', side_effect=RuntimeError("boom")):
+        engine = create_engine("sqlite:///:memory:")
+        models.Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        mock_get_session.return_value = Session()
+
+        df_prod = pd.DataFrame({'Appl_No': ['1'], 'Appl_Type': ['N'], 'Product_No': ['1'], 'Trade_Name': ['T1']})
+        df_pat = pd.DataFrame({'Appl_No': ['1'], 'Appl_Type': ['N'], 'Product_No': ['1'], 'Patent_No': ['P1']})
+        mock_read_csv.side_effect = [df_prod, df_pat, pd.DataFrame()]
+
+        harvester.harvest(full_refresh=True)
+
+        session = Session()
+        assert session.query(models.Product).count() == 0
+        assert session.query(models.Patent).count() == 0
+
+def test_loaders_bypass_the_orm(db_session):
+    """Loading goes straight through Core inserts, with no ORM objects to track or flush."""
+    keys = {'Appl_No': ['123'], 'Appl_Type': ['A'], 'Product_No': ['001']}
+    harvester.load_products(db_session, pd.DataFrame({**keys, 'Trade_Name': ['DrugA']}))
+    harvester.load_patents(db_session, pd.DataFrame({**keys, 'Patent_No': ['Pat1']}))
+    harvester.load_exclusivity(db_session, pd.DataFrame({**keys, 'Exclusivity_Code': ['E1']}))
+
+    assert not db_session.new
+    assert len(db_session.identity_map) == 0
+    db_session.commit()
+    assert db_session.query(models.Exclusivity).one().exclusivity_code == 'E1'
+
+def test_records_renames_and_nulls_missing_values():
+    df = pd.DataFrame({'Appl_No': ['123', '456'], 'Trade_Name': ['DrugA', None], 'Strength': [float('nan'), '5MG']})
+
+    assert harvester._records(df, {'Appl_No': 'appl_no', 'Trade_Name': 'trade_name', 'Strength': 'strength'}) == [
+        {'appl_no': '123', 'trade_name': 'DrugA', 'strength': None},
+        {'appl_no': '456', 'trade_name': None, 'strength': '5MG'},
+    ]
+
+def test_create_tables_indexes_product_keys(tmp_path):
+    """Patents and exclusivity are indexed by product, including on databases created before the indexes."""
+    import sqlite3
+    from sqlalchemy import inspect
+
+    db_path = tmp_path / "old.db"
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE patents (id INTEGER PRIMARY KEY, appl_no VARCHAR, appl_type VARCHAR, product_no VARCHAR)")
+    con.close()
+
+    with patch.object(config, "DB_URL", f"sqlite:///{db_path}"):
+        models.create_tables()
+        inspector = inspect(models.get_engine())
+        for table in ("patents", "exclusivity"):
+            assert [i["column_names"] for i in inspector.get_indexes(table)] == [["appl_no", "appl_type", "product_no"]]
+
+def test_download_data_streams_zip_to_disk(tmp_path):
+    import io
+    import zipfile
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr('products.txt', 'Appl_No~Product_No\n1~1\n')
+    data = buffer.getvalue()
+
+    with patch.object(config, 'DATA_DIR', tmp_path), \
+         patch('biomed_tools.orange_book.utils.requests.get') as mock_get:
+        response = mock_get.return_value.__enter__.return_value
+        response.iter_content.return_value = [data[:10], data[10:]]
+
+        utils.download_data()
+
+    assert mock_get.call_args.kwargs['stream'] is True
+    assert (tmp_path / 'products.txt').read_text() == 'Appl_No~Product_No\n1~1\n'
+    assert not (tmp_path / '_download.zip').exists()
+
+def test_get_session_reuses_engine_per_db_url(tmp_path):
+    """Sessions share one engine per DB_URL, and a new URL gets its own."""
+    with patch.object(config, "DB_URL", f"sqlite:///{tmp_path}/a.db"):
+        first, second = models.get_session(), models.get_session()
+        assert first.get_bind() is second.get_bind() is models.get_engine()
+    with patch.object(config, "DB_URL", f"sqlite:///{tmp_path}/b.db"):
+        assert models.get_session().get_bind() is not first.get_bind()